@@ -1,4 +1,8 @@
 from fastapi import APIRouter
+from utils.vector_store import check_health
+from utils.embedding_cache import get_embedding_cache
+from utils.query_cache import query_embedding_cache
+from utils.answer_cache import answer_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,4 +15,19 @@ def health():
         "status": "ok",
         "message": "Chat service is running",
         "version": "1.0.0"
-    }
\ No newline at end of file
+    }
+
+@router.get("/vector-store")
+def vector_store_health():
+    """Reports whether Qdrant is reachable and the round-trip latency."""
+    return check_health()
+
+@router.get("/caches")
+def cache_stats():
+    """Reports hit/miss counters of the embedding caches."""
+    embedding_cache = get_embedding_cache()
+    return {
+        "embedding_cache": embedding_cache.stats() if embedding_cache else None,
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "answer_cache": answer_cache.stats()
+    }
@@ -1,27 +1,65 @@
+from typing import List
 from fastapi import APIRouter, HTTPException, File, UploadFile
-from models.schema import FileUpload
-from services.upload import FileUploadService
+from config import settings
+from models.schema import FileUpload, IndexingJob
+from services.upload import DuplicateFileError, FileUploadService, UploadTooLargeError
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/uploads", tags=["Uploads"])
 file_management_process = FileUploadService()
 
+# Room for the multipart boundaries and part headers around a single file.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Request body limits, applied by BodySizeLimitMiddleware while the body is received.
+BODY_LIMITS = {
+    f"{router.prefix}/file-upload": settings.UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD_BYTES,
+    f"{router.prefix}/bulk-upload": settings.UPLOAD_MAX_REQUEST_BYTES,
+}
 
-@router.post("/file-upload", response_model=bool)
+
+@router.post("/file-upload", response_model=dict)
 def add_file(user_id: str, file: UploadFile = File(...)):
     """
-    Upload a file.
+    Upload a file. Indexing runs in the background; poll the returned job ID for progress.
+    Files over the size limit are rejected with 413 (bodies far over it before they are even
+    received), files the user already uploaded with 409.
     """
     try:
-        result = file_management_process.add_file(file, user_id)
-        if result:
-            return True
+        job_id = file_management_process.add_file(file, user_id)
+        if job_id:
+            return {"job_id": job_id}
         else:
             raise HTTPException(status_code=400, detail="File upload failed.")
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except DuplicateFileError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "file_id": e.file_id})
     except Exception as e:
         logger.error(f"Error uploading file: {e}")
         raise HTTPException(status_code=500, detail="Internal server error during file upload.")
+
+
+@router.post("/bulk-upload", response_model=dict)
+def add_files(user_id: str, files: List[UploadFile] = File(...)):
+    """
+    Upload many files at once. New files are registered together and indexed by a single
+    background job; duplicates and files over the size limit are reported and skipped.
+    """
+    try:
+        result = file_management_process.add_files(
+            ((file.filename, file.content_type, file.file, file.size) for file in files), user_id
+        )
+        if result is None:
+            raise HTTPException(status_code=400, detail="File upload failed.")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error uploading files: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error during file upload.")
     
 @router.get("/files", response_model=list[FileUpload])
 def get_files(user_id: str):
@@ -53,3 +91,16 @@ def delete_file(file_id: str):
         logger.error(f"Error deleting file: {e}")
         raise HTTPException(status_code=500, detail="Internal server error during file deletion.")
 
+@router.get("/jobs/{job_id}", response_model=IndexingJob)
+def get_job(job_id: str):
+    """
+    Get the status and progress of an indexing job.
+    """
+    try:
+        job = file_management_process.get_job_by_id(job_id)
+    except Exception as e:
+        logger.error(f"Error fetching job: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error while fetching job.")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
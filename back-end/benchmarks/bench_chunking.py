@@ -0,0 +1,85 @@
+"""
+Compares chunkers on chunk counts, token sizes, chunking throughput and retrieval quality.
+
+Each chunker spec ("name:size:overlap", see utils.chunkers) chunks the same corpus, which is
+then indexed and searched exactly as in bench_retrieval, fully offline.
+
+Run from the back-end folder:
+    python -m benchmarks.bench_chunking --chunkers recursive:500:50 simple:500:50 token:256:32 structure:256:32
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from benchmarks.bench_retrieval import bench_indexing, bench_search, synthetic_dataset
+from utils.chunkers import get_chunker
+from utils.tokens import count_tokens
+
+
+def bench_chunker(dataset: dict, spec: str) -> dict:
+    chunker = get_chunker(spec)
+    texts = [document["text"] for document in dataset["documents"]]
+    start = time.perf_counter()
+    boundaries = [chunker.split(text) for text in texts]
+    seconds = time.perf_counter() - start
+
+    tokens = [count_tokens(text[a:b]) for text, spans in zip(texts, boundaries) for a, b in spans]
+    megabytes = sum(len(text.encode("utf-8")) for text in texts) / 1_000_000
+    return {
+        "chunks": len(tokens),
+        "tokens_per_chunk": {
+            "mean": round(sum(tokens) / len(tokens), 1) if tokens else 0,
+            "min": min(tokens, default=0),
+            "max": max(tokens, default=0),
+        },
+        "seconds": round(seconds, 3),
+        "chunks_per_second": round(len(tokens) / seconds, 1) if seconds else None,
+        "mb_per_second": round(megabytes / seconds, 2) if seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", help="labeled JSON dataset; a synthetic one is generated when omitted")
+    parser.add_argument("--documents", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--chunkers", nargs="+",
+                        default=["recursive:500:50", "simple:500:50", "token:256:32", "structure:256:32"])
+    parser.add_argument("--top-k", type=int, default=20, help="chunks retrieved per query")
+    parser.add_argument("--fusion", default="rrf")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.dataset:
+        with open(args.dataset) as file:
+            dataset = json.load(file)
+    else:
+        dataset = synthetic_dataset(args.documents, args.queries, args.seed)
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "dataset": args.dataset or f"synthetic(documents={args.documents}, queries={args.queries}, seed={args.seed})",
+        "top_k": args.top_k,
+        "fusion": args.fusion,
+        "chunkers": {},
+    }
+    for spec in args.chunkers:
+        chunking = bench_chunker(dataset, spec)
+        indexing = bench_indexing(dataset, args.batch_size, get_chunker(spec))
+        search = asyncio.run(bench_search(dataset, args.fusion, args.top_k))
+        results["chunkers"][spec] = {"chunking": chunking, "indexing": indexing, "search": search}
+        print(f"{spec:>18}: chunks={chunking['chunks']} tokens/chunk={chunking['tokens_per_chunk']['mean']} "
+              f"{chunking['mb_per_second']}MB/s index={indexing['chunks_per_second']} chunks/s "
+              f"recall@5={search['recall@5']} mrr={search['mrr']}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
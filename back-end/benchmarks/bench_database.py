@@ -0,0 +1,129 @@
+"""
+Database throughput under N parallel clients.
+
+Compares the pooled, WAL-mode connection layer against the previous setup (one shared
+rollback-journal connection behind a lock), with a read-heavy mix like chat traffic.
+
+Run from the back-end folder:
+    python -m benchmarks.bench_database --clients 1 2 4 8 16 --seconds 3
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from core.database import ConnectionPool
+
+CONVERSATIONS = 200
+CHATS_PER_CONVERSATION = 50
+
+
+def create_database(path: str) -> list:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE conversations (id TEXT PRIMARY KEY, user_id TEXT, title TEXT NOT NULL)")
+    conn.execute("CREATE TABLE chats (id TEXT PRIMARY KEY, conversation_id TEXT, content TEXT NOT NULL, updated_at DATETIME)")
+    conn.execute("CREATE INDEX idx_chats_conversation ON chats (conversation_id)")
+    conversation_ids = [str(uuid.uuid4()) for _ in range(CONVERSATIONS)]
+    conn.executemany("INSERT INTO conversations VALUES (?, ?, ?)",
+                     [(cid, str(uuid.uuid4()), "New Chat") for cid in conversation_ids])
+    conn.executemany("INSERT INTO chats VALUES (?, ?, ?, ?)", [
+        (str(uuid.uuid4()), cid, json.dumps({"HumanMessage": "q" * 100, "AIResponse": "a" * 600}), datetime.now().isoformat())
+        for cid in conversation_ids for _ in range(CHATS_PER_CONVERSATION)
+    ])
+    conn.commit()
+    conn.close()
+    return conversation_ids
+
+
+class SharedConnection:
+    """The previous layer: one connection shared by every thread, serialized by a lock."""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def read(self, query, params):
+        with self.lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def write(self, query, params):
+        with self.lock:
+            self.conn.execute(query, params)
+            self.conn.commit()
+
+
+class PooledConnection:
+    def __init__(self, path: str):
+        self.pool = ConnectionPool(path)
+
+    def read(self, query, params):
+        return self.pool.connection().execute(query, params).fetchall()
+
+    def write(self, query, params):
+        conn = self.pool.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(query, params)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def run(layer, conversation_ids: list, clients: int, seconds: float, write_ratio: float) -> dict:
+    stop_at = time.perf_counter() + seconds
+    counts = [0] * clients
+
+    def client(index):
+        rng = random.Random(index)
+        while time.perf_counter() < stop_at:
+            conversation_id = rng.choice(conversation_ids)
+            if rng.random() < write_ratio:
+                layer.write("INSERT INTO chats VALUES (?, ?, ?, ?)",
+                            (str(uuid.uuid4()), conversation_id, "{}", datetime.now().isoformat()))
+            else:
+                layer.read("SELECT * FROM chats WHERE conversation_id = ? ORDER BY updated_at", (conversation_id,))
+            counts[index] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = sum(counts)
+    return {"clients": clients, "operations": total, "ops_per_sec": round(total / seconds, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {"write_ratio": args.write_ratio, "seconds": args.seconds, "layers": {}}
+    for name, layer_cls in (("shared_connection", SharedConnection), ("pooled_wal", PooledConnection)):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bench.db")
+            conversation_ids = create_database(path)
+            runs = []
+            for clients in args.clients:
+                layer = layer_cls(path)
+                runs.append(run(layer, conversation_ids, clients, args.seconds, args.write_ratio))
+                print(f"{name:>18} clients={clients:<3} {runs[-1]['ops_per_sec']:>10} ops/s")
+            results["layers"][name] = runs
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Indexing throughput, hybrid-search latency and retrieval quality, fully offline.
+
+Runs against Qdrant's in-memory mode and the deterministic fake dense embedder (BM25 still
+comes from fastembed), so results only move when the code under test does. By default a
+labeled corpus is generated from --seed; --dataset loads one from JSON instead:
+    {"documents": [{"id": "...", "text": "..."}], "queries": [{"query": "...", "relevant": ["<document id>"]}]}
+
+Recall@k and MRR are measured per document: the ranked chunks are collapsed to the distinct
+documents they came from.
+
+Run from the back-end folder:
+    python -m benchmarks.bench_retrieval --documents 500 --queries 200 --output retrieval.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import string
+import time
+import uuid
+from datetime import datetime
+
+# The benchmark must never reach Gemini or a Qdrant server; these win over .env.
+os.environ["QDRANT_URL"] = ":memory:"
+os.environ["DENSE_EMBEDDER"] = "fake"
+os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+os.environ["QUERY_CACHE_DISK_TIER"] = "false"
+
+from config import settings  # noqa: E402
+from utils.chunkers import Chunker, get_chunker  # noqa: E402
+from utils.data_indexing_pipeline import create_qdrant_client, index_chunks  # noqa: E402
+from utils.rag_pipeline import hybrid_search  # noqa: E402
+from utils.vector_store import collection_for_user  # noqa: E402
+
+USER_ID = "benchmark"
+COLLECTION_NAME = collection_for_user(USER_ID)
+RECALL_AT = (1, 3, 5, 10)
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+
+
+def synthetic_dataset(documents: int, queries: int, seed: int) -> dict:
+    """Documents are numbered sections of sentences mixing a shared vocabulary with a few topic
+    words of their own; each query asks for three topic words of one document among three common words."""
+    rng = random.Random(seed)
+    vocabulary = [_word(rng) for _ in range(3000)]
+    docs = []
+    for i in range(documents):
+        topic = [_word(rng) for _ in range(8)]
+        sentences = []
+        for _ in range(rng.randint(15, 60)):
+            words = [rng.choice(topic) if rng.random() < 0.08 else rng.choice(vocabulary)
+                     for _ in range(rng.randint(6, 16))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraphs = [
+            f"{number}. {' '.join(rng.sample(vocabulary, 3)).capitalize()}\n" + " ".join(sentences[start:start + 5])
+            for number, start in enumerate(range(0, len(sentences), 5), start=1)
+        ]
+        docs.append({"id": f"doc-{i}", "text": "\n\n".join(paragraphs), "topic": topic})
+
+    labeled_queries = []
+    for _ in range(queries):
+        doc = rng.choice(docs)
+        terms = rng.sample(doc["topic"], 3) + rng.sample(vocabulary, 3)
+        rng.shuffle(terms)
+        labeled_queries.append({"query": " ".join(terms), "relevant": [doc["id"]]})
+    return {"documents": docs, "queries": labeled_queries}
+
+
+def iter_dataset_chunks(dataset: dict, chunker: Chunker):
+    """Chunks the documents in the shape iter_files_chunks yields."""
+    for document in dataset["documents"]:
+        for ordinal, (start, end) in enumerate(chunker.split(document["text"])):
+            yield {
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{document['id']}:{ordinal}")),
+                "text": document["text"][start:end],
+                "metadata": {
+                    "file_id": document["id"],
+                    "user_id": USER_ID,
+                    "chunk_index": ordinal,
+                    "start_offset": start,
+                    "end_offset": end
+                }
+            }
+
+
+def percentile(values: list, p: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(1, round(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def bench_indexing(dataset: dict, batch_size: int, chunker: Chunker) -> dict:
+    qdrant_client = create_qdrant_client(COLLECTION_NAME, recreate=True)
+    start = time.perf_counter()
+    chunks = index_chunks(qdrant_client, COLLECTION_NAME, iter_dataset_chunks(dataset, chunker), batch_size=batch_size)
+    seconds = time.perf_counter() - start
+    return {
+        "documents": len(dataset["documents"]),
+        "chunks": chunks,
+        "seconds": round(seconds, 3),
+        "chunks_per_second": round(chunks / seconds, 1) if seconds else None,
+    }
+
+
+async def bench_search(dataset: dict, fusion: str, top_k: int) -> dict:
+    latencies = []
+    recalls = {k: 0.0 for k in RECALL_AT}
+    reciprocal_ranks = 0.0
+    for labeled in dataset["queries"]:
+        relevant = set(labeled["relevant"])
+        start = time.perf_counter()
+        results = await hybrid_search(labeled["query"], COLLECTION_NAME, top_k=top_k, fusion=fusion, user_id=USER_ID)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        ranked = list(dict.fromkeys(result.payload["file_id"] for result in results))
+        for k in RECALL_AT:
+            recalls[k] += len(relevant.intersection(ranked[:k])) / len(relevant)
+        first_hit = next((rank for rank, doc_id in enumerate(ranked, start=1) if doc_id in relevant), None)
+        if first_hit:
+            reciprocal_ranks += 1 / first_hit
+
+    queries = len(dataset["queries"])
+    return {
+        "queries": queries,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "mean": round(sum(latencies) / queries, 2),
+        },
+        **{f"recall@{k}": round(recalls[k] / queries, 4) for k in RECALL_AT},
+        "mrr": round(reciprocal_ranks / queries, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", help="labeled JSON dataset; a synthetic one is generated when omitted")
+    parser.add_argument("--documents", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--chunker", default=settings.CHUNKER, help="chunker spec, e.g. token:256:32")
+    parser.add_argument("--top-k", type=int, default=20, help="chunks retrieved per query")
+    parser.add_argument("--fusion", nargs="+", default=["rrf", "dbsf", "weighted"])
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.dataset:
+        with open(args.dataset) as file:
+            dataset = json.load(file)
+    else:
+        dataset = synthetic_dataset(args.documents, args.queries, args.seed)
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "dataset": args.dataset or f"synthetic(documents={args.documents}, queries={args.queries}, seed={args.seed})",
+        "top_k": args.top_k,
+        "chunker": args.chunker,
+        "indexing": bench_indexing(dataset, args.batch_size, get_chunker(args.chunker)),
+        "search": {},
+    }
+    print(f"indexing: {results['indexing']['chunks_per_second']} chunks/s")
+    for fusion in args.fusion:
+        search = asyncio.run(bench_search(dataset, fusion, args.top_k))
+        results["search"][fusion] = search
+        print(f"{fusion:>9}: p50={search['latency_ms']['p50']}ms p95={search['latency_ms']['p95']}ms "
+              f"p99={search['latency_ms']['p99']}ms recall@5={search['recall@5']} mrr={search['mrr']}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
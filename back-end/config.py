@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     APP_NAME: str = "Chatbot API"
@@ -15,10 +15,98 @@ class Settings(BaseSettings):
     
     # Database settings (for future use)
     DATABASE_URL: str = "database.db"
+    DATABASE_BUSY_TIMEOUT_MS: int = 5000
+    DATABASE_CACHE_SIZE_KB: int = 20000
+    DATABASE_MMAP_SIZE: int = 268435456
     GEMINI_KEY: str = ""
     GEMINI_EMBEDDING_MODEL:str = "models/text-embedding-004"
     SPARSE_EMBEDDING_MODEL:str = "Qdrant/bm25"
     UPLOAD_DIR:str = "data"
+    UPLOAD_MAX_BYTES: int = 500 * 1024 * 1024  # uploads larger than this are rejected
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024  # uploads are copied to disk and hashed this much at a time
+    UPLOAD_MAX_REQUEST_BYTES: int = 2 * 1024 * 1024 * 1024  # whole body of a bulk upload, enforced while it arrives
+
+    # Embedding settings
+    DENSE_EMBEDDER: str = "gemini"  # "gemini" or "fake" (deterministic, offline)
+    DENSE_VECTOR_SIZE: int = 768
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_RETRIES: int = 3  # retries of a batch after a transient (rate limit, timeout, 5xx) failure
+    EMBEDDING_RETRY_BACKOFF: float = 1.0  # seconds, doubled on every retry
+    SPARSE_EMBEDDING_BATCH_SIZE: int = 256
+    # None: in-process; 0: one worker process per core; N: N worker processes. The pool is started once
+    # and each worker keeps the BM25 model loaded; every indexing batch is split across the workers.
+    SPARSE_EMBEDDING_PARALLEL: Optional[int] = None
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "cache/embeddings.db"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 500000
+
+    # Qdrant settings
+    QDRANT_URL: str = "http://127.0.0.1:6333"  # ":memory:" runs an in-process instance (tests/benchmarks)
+    QDRANT_API_KEY: Optional[str] = None
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT: int = 30  # seconds per request
+    QDRANT_RETRIES: int = 3  # retries of transient (network / 5xx) failures
+    QDRANT_RETRY_BACKOFF: float = 0.5  # seconds, doubled on every retry
+    QDRANT_MAX_CONNECTIONS: int = 100  # HTTP connection pool size
+    QDRANT_COLLECTION_MODE: str = "per_user"  # "per_user": one collection per user, "shared": every user in QDRANT_SHARED_COLLECTION
+    QDRANT_SHARED_COLLECTION: str = "shared_collection"
+    QDRANT_SHARED_HNSW_PAYLOAD_M: int = 16  # the shared collection builds one HNSW graph per user instead of a global one
+
+    # Qdrant collection settings, applied when a collection is created (manage_collections.py sync applies them to existing ones)
+    QDRANT_PAYLOAD_INDEXES: List[str] = ["file_id", "user_id"]  # keyword indexes, so filtered searches and deletes skip full scans
+    QDRANT_ON_DISK_PAYLOAD: bool = False  # keep payloads (chunk text) on disk instead of in RAM
+    QDRANT_DENSE_ON_DISK: bool = False  # memory-map the original dense vectors; pair with quantization to keep search fast
+    QDRANT_QUANTIZATION: str = "none"  # "none", "scalar" (int8, 4x smaller) or "binary" (1 bit, 32x smaller)
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = True  # pin the quantized vectors in RAM
+    QDRANT_QUANTIZATION_RESCORE: bool = True  # rescore quantized candidates with the original vectors
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = 2.0  # quantized candidates fetched per result before rescoring
+    QDRANT_HNSW_M: Optional[int] = None  # None keeps Qdrant's default (16)
+    QDRANT_HNSW_EF_CONSTRUCT: Optional[int] = None  # None keeps Qdrant's default (100)
+    QDRANT_HNSW_ON_DISK: bool = False
+    QDRANT_HNSW_EF: Optional[int] = None  # search-time beam width, None keeps Qdrant's default
+
+    # Retrieval settings
+    HYBRID_FUSION: str = "rrf"  # "rrf" or "dbsf" (fused in Qdrant), "weighted" (client-side score blend)
+    QUERY_CACHE_MAX_ENTRIES: int = 10000  # in-process LRU of query embeddings
+    QUERY_CACHE_TTL_SECONDS: float = 3600.0
+    QUERY_CACHE_DISK_TIER: bool = True  # also keep query embeddings in the shared SQLite embedding cache
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95  # cosine similarity a new query needs to reuse an answer
+    ANSWER_CACHE_MAX_ENTRIES_PER_USER: int = 200
+    ANSWER_CACHE_TTL_SECONDS: float = 86400.0
+    RERANK_ENABLED: bool = False  # rescore retrieved chunks with a local cross-encoder before generation
+    RERANK_MODEL: str = "Xenova/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 20  # chunks retrieved for the reranker to choose the final top_k from
+    RERANK_BATCH_SIZE: int = 16
+    RERANK_BUDGET_MS: float = 300.0  # no further batches are scored once this much time has passed
+    RERANK_THREADS: Optional[int] = None  # ONNX runtime threads, None lets onnxruntime decide
+    CONTEXT_TOKEN_BUDGET: int = 2000  # tokens of retrieved text sent with each question
+    CONTEXT_DUPLICATE_THRESHOLD: float = 0.8  # share of a section's word 3-grams already in a kept section for it to be dropped
+
+    # Chat settings
+    CHAT_TITLE_MAX_TURNS: int = 3  # regenerate the conversation title only while it has fewer turns than this
+    CHAT_MEMORY_RECENT_TURNS: int = 4  # turns kept verbatim in the prompt, the older ones live in the summary
+    CHAT_MEMORY_SUMMARIZE_EVERY: int = 4  # older turns are folded into the summary this many at a time
+    CHAT_MEMORY_TOKEN_BUDGET: int = 1500  # tokens of summary + recent turns sent with each prompt
+    CHAT_MEMORY_SUMMARY_MAX_WORDS: int = 200
+
+    # Indexing pipeline settings
+    INDEXING_BATCH_SIZE: int = 256  # chunks embedded and upserted per batch
+    INDEXING_MAX_PENDING_BATCHES: int = 2  # embedded batches allowed to wait for upsert
+    INDEXING_WORKERS: int = 2  # background indexing jobs running at once (one per user at a time)
+    INDEXING_WORKER_LOCK_DIR: str = "cache/workers"  # lock files telling server processes whether a job's runner is still alive
+    EXTRACTION_WORKERS: int = 0  # text extraction processes, 0 means one per CPU core
+    EXTRACTION_PAGES_PER_TASK: int = 20  # PDF pages extracted per process-pool task
+    EXTRACTION_PAGE_TIMEOUT: float = 30.0  # seconds allowed per page before a page range is skipped
+    # Chunker spec "name[:size[:overlap]]": recursive/simple are sized in characters, token/structure in tokens.
+    CHUNKER: str = "recursive:500:50"
+    # Per-collection chunker specs, keyed by collection name. In shared mode every user is in
+    # QDRANT_SHARED_COLLECTION, so its entry (or CHUNKER) applies to all of them.
+    COLLECTION_CHUNKERS: Dict[str, str] = {}
+    CHUNK_STORE_DIR: str = "cache/chunks"  # extracted text and chunk boundaries, keyed by file SHA-256
+    TOKENIZER_MODEL: str = "bert-base-uncased"  # Hugging Face tokenizer used for token counts
 
     
     # Logging
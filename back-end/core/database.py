@@ -1,21 +1,105 @@
 import sqlite3
+import threading
 from contextlib import contextmanager
-from typing import Any, Generator
+from typing import Generator
 import logging
 from fastapi import HTTPException
 from config import settings
 
-conn = sqlite3.connect(settings.DATABASE_URL, check_same_thread=False)
+
+class ConnectionPool:
+    """
+    Hands out one SQLite connection per thread.
+
+    Connections run in WAL mode so readers never block the writer (or each other), wait up to
+    `busy_timeout_ms` for locks instead of failing, and are in autocommit mode: writes are
+    grouped with explicit transactions via `transaction()`.
+    """
+
+    def __init__(self, database: str, busy_timeout_ms: int = settings.DATABASE_BUSY_TIMEOUT_MS):
+        self.database = database
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        # Safe with WAL: a crash can lose the last commits but never corrupts the database.
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA cache_size=-{int(settings.DATABASE_CACHE_SIZE_KB)}")
+        conn.execute(f"PRAGMA mmap_size={int(settings.DATABASE_MMAP_SIZE)}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Returns the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close_all(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
+
+pool = ConnectionPool(settings.DATABASE_URL)
+
 
 @contextmanager
 def get_db_connection() -> Generator[sqlite3.Connection, None, None]:
     """
     Context manager to handle database connections.
     """
+    try:
+        yield pool.connection()
+    except sqlite3.Error as e:
+        logging.error(f"Database error: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
+
+
+@contextmanager
+def transaction() -> Generator[sqlite3.Connection, None, None]:
+    """
+    Context manager that runs the enclosed statements in one write transaction.
+    Commits on success and rolls back on any error.
+    """
+    conn = pool.connection()
+    try:
+        # IMMEDIATE takes the write lock up front, so concurrent writers queue on busy_timeout
+        # instead of failing with "database is locked" when upgrading from a read.
+        conn.execute("BEGIN IMMEDIATE")
+    except sqlite3.Error as e:
+        logging.error(f"Database error: {e}")
+        raise HTTPException(status_code=500, detail="Database error occurred")
     try:
         yield conn
+        conn.execute("COMMIT")
+    except sqlite3.IntegrityError:
+        # Constraint violations mean something to the caller (e.g. a duplicate), so they pass through.
+        conn.execute("ROLLBACK")
+        raise
     except sqlite3.Error as e:
+        conn.execute("ROLLBACK")
         logging.error(f"Database error: {e}")
         raise HTTPException(status_code=500, detail="Database error occurred")
-    finally:
-        conn.commit()
\ No newline at end of file
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
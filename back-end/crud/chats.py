@@ -1,52 +1,114 @@
-from utils.helper import execute_fetch_query, execute_insert_or_update_query
+from utils.helper import execute_fetch_query_async, execute_insert_or_update_query_async
 from datetime import datetime
 import uuid
 import json
 
 class ChatCrud:
-    def get_chats_by_id(self, conversation_id: str):
+    async def get_chats_by_id(self, conversation_id: str):
         try:
         # fetching chat history from a database
             query = "SELECT * FROM chats WHERE conversation_id = ? order by updated_at"
             params = (conversation_id,)
-            result = execute_fetch_query(query, params)
+            result = await execute_fetch_query_async(query, params)
             if not result:
                 return []
             return result
         except Exception as e:
             raise ValueError(f"Error fetching chats for conversation {conversation_id}: {str(e)}")
 
-    def add_chat(self, conversation_id: str, message: str, response: str):
+    async def get_recent_chats(self, conversation_id: str, limit: int, after: str = ""):
+        # fetching the newest `limit` chats stored after `after`, oldest first, as (content, updated_at)
+        try:
+            query = ("SELECT content, updated_at FROM chats WHERE conversation_id = ? AND updated_at > ? "
+                     "ORDER BY updated_at DESC LIMIT ?")
+            params = (conversation_id, after, limit)
+            result = await execute_fetch_query_async(query, params)
+            return list(reversed(result)) if result else []
+        except Exception as e:
+            raise ValueError(f"Error fetching recent chats for conversation {conversation_id}: {str(e)}")
+
+    async def get_oldest_chats(self, conversation_id: str, limit: int, after: str = ""):
+        # fetching the oldest `limit` chats stored after `after`, as (content, updated_at)
+        try:
+            query = ("SELECT content, updated_at FROM chats WHERE conversation_id = ? AND updated_at > ? "
+                     "ORDER BY updated_at LIMIT ?")
+            params = (conversation_id, after, limit)
+            result = await execute_fetch_query_async(query, params)
+            return result if result else []
+        except Exception as e:
+            raise ValueError(f"Error fetching chats for conversation {conversation_id}: {str(e)}")
+
+    async def get_conversation_memory(self, conversation_id: str):
+        # fetching (summary, summarized_until) of a conversation; chats up to summarized_until are in the summary
+        try:
+            query = "SELECT summary, summarized_until FROM conversation_memory WHERE conversation_id = ?"
+            params = (conversation_id,)
+            result = await execute_fetch_query_async(query, params)
+            if not result:
+                return "", ""
+            return result[0][0], result[0][1]
+        except Exception as e:
+            raise ValueError(f"Error fetching memory for conversation {conversation_id}: {str(e)}")
+
+    async def save_conversation_memory(self, conversation_id: str, summary: str, summarized_until: str):
+        try:
+            query = """
+                INSERT INTO conversation_memory (conversation_id, summary, summarized_until, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(conversation_id) DO UPDATE SET
+                    summary = excluded.summary,
+                    summarized_until = excluded.summarized_until,
+                    updated_at = excluded.updated_at
+            """
+            params = (conversation_id, summary, summarized_until, datetime.now())
+            if await execute_insert_or_update_query_async(query, params):
+                return True
+            return False
+        except Exception as e:
+            raise ValueError(f"Error saving memory for conversation {conversation_id}: {str(e)}")
+
+    async def add_chat(self, conversation_id: str, message: str, response: str):
         # adding a chat to a database
         try:
             chat_id = str(uuid.uuid4())
             query = "INSERT INTO chats (id, conversation_id, content, updated_at) VALUES (?, ?, ?, ?)"
             params = (chat_id, conversation_id, json.dumps({"HumanMessage": message, "AIResponse": response}), datetime.now())
-            if execute_insert_or_update_query(query, params):
+            if await execute_insert_or_update_query_async(query, params):
                 return True
             return False
         except Exception as e:
             raise ValueError(f"Error adding chat for conversation {conversation_id}: {str(e)}")
     
-    def get_user_id_by_conversation_id(self, conversation_id: str):
+    async def get_user_id_by_conversation_id(self, conversation_id: str):
         # fetching user ID by conversation ID from a database
         try:
             query = "SELECT user_id FROM conversations WHERE id = ?"
             params = (conversation_id,)
-            result = execute_fetch_query(query, params)
+            result = await execute_fetch_query_async(query, params)
             if not result:
                 raise ValueError(f"No user found for conversation ID {conversation_id}")
             return result[0][0]
         except Exception as e:
             raise ValueError(f"Error fetching user ID for conversation {conversation_id}: {str(e)}")
     
-    def update_conversation_name(self, conversation_id, conversation_name):
+    async def update_conversation_name(self, conversation_id, conversation_name):
         # updating conversation name in a database
         try:
             query = "UPDATE conversations SET title = ? WHERE id = ?"
             params = (conversation_name, conversation_id)
-            if execute_insert_or_update_query(query, params):
+            if await execute_insert_or_update_query_async(query, params):
                 return True
             return False
         except Exception as e:
-            raise ValueError(f"Error updating conversation name for {conversation_id}: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error updating conversation name for {conversation_id}: {str(e)}")
+
+    async def get_collection_version(self, user_id: str):
+        # The user's indexing jobs change whenever a file is added or removed, and while one
+        # runs its progress updates keep changing updated_at, so this pair moves with the collection.
+        try:
+            query = "SELECT COUNT(*), MAX(updated_at) FROM indexing_jobs WHERE user_id = ?"
+            params = (user_id,)
+            result = await execute_fetch_query_async(query, params)
+            return tuple(result[0]) if result else (0, None)
+        except Exception as e:
+            raise ValueError(f"Error fetching collection version for user {user_id}: {str(e)}")
@@ -0,0 +1,97 @@
+from utils.helper import execute_fetch_query, execute_insert_or_update_query
+from datetime import datetime
+import json
+
+class JobCrud():
+    def __init__(self):
+        pass
+
+    def add_job(self, job_id, user_id, kind, file_ids):
+        """
+        Add a new queued indexing job.
+        """
+        try:
+            now = datetime.now()
+            query = ("INSERT INTO indexing_jobs (id, user_id, kind, status, file_ids, total_files, files_processed, "
+                     "chunks_embedded, chunks_upserted, error, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 0, 0, 0, NULL, ?, ?)")
+            params = (job_id, user_id, kind, "queued", json.dumps(file_ids), len(file_ids), now, now)
+            result = execute_insert_or_update_query(query, params)
+
+            return True if result else False
+        except Exception as e:
+            raise ValueError(f"Error adding job for user ID {user_id}: {str(e)}")
+
+    def update_job_status(self, job_id, status, error=None):
+        """
+        Update the status (and error message) of a job.
+        """
+        try:
+            query = "UPDATE indexing_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?"
+            params = (status, error, datetime.now(), job_id)
+            return execute_insert_or_update_query(query, params)
+        except Exception as e:
+            raise ValueError(f"Error updating status of job {job_id}: {str(e)}")
+
+    def claim_job(self, job_id, worker_id):
+        """
+        Mark a queued job as running on the given worker. Returns False if another
+        process claimed it first (or it is no longer queued).
+        """
+        try:
+            query = ("UPDATE indexing_jobs SET status = 'running', worker = ?, updated_at = ? "
+                     "WHERE id = ? AND status = 'queued'")
+            params = (worker_id, datetime.now(), job_id)
+            return execute_insert_or_update_query(query, params)
+        except Exception as e:
+            raise ValueError(f"Error claiming job {job_id}: {str(e)}")
+
+    def requeue_orphaned_job(self, job_id, worker_id):
+        """
+        Put a running job whose worker died back in the queue. Returns False if its
+        state changed in the meantime.
+        """
+        try:
+            query = ("UPDATE indexing_jobs SET status = 'queued', worker = NULL, updated_at = ? "
+                     "WHERE id = ? AND status = 'running' AND worker IS ?")
+            params = (datetime.now(), job_id, worker_id)
+            return execute_insert_or_update_query(query, params)
+        except Exception as e:
+            raise ValueError(f"Error requeueing job {job_id}: {str(e)}")
+
+    def update_job_progress(self, job_id, files_processed, chunks_embedded, chunks_upserted):
+        """
+        Update the progress counters of a job.
+        """
+        try:
+            query = ("UPDATE indexing_jobs SET files_processed = ?, chunks_embedded = ?, chunks_upserted = ?, "
+                     "updated_at = ? WHERE id = ?")
+            params = (files_processed, chunks_embedded, chunks_upserted, datetime.now(), job_id)
+            return execute_insert_or_update_query(query, params)
+        except Exception as e:
+            raise ValueError(f"Error updating progress of job {job_id}: {str(e)}")
+
+    def get_job_by_id(self, job_id):
+        """
+        Fetch a job by its ID.
+        """
+        try:
+            query = "SELECT * FROM indexing_jobs WHERE id = ?"
+            params = (job_id,)
+            result = execute_fetch_query(query, params)
+
+            return result[0] if result else None
+        except Exception as e:
+            raise ValueError(f"Error fetching job {job_id}: {str(e)}")
+
+    def get_unfinished_jobs(self):
+        """
+        Fetch jobs that were queued or running, oldest first.
+        """
+        try:
+            query = ("SELECT id, user_id, kind, status, file_ids, worker FROM indexing_jobs "
+                     "WHERE status IN ('queued', 'running') ORDER BY created_at")
+            result = execute_fetch_query(query)
+
+            return result if result else []
+        except Exception as e:
+            raise ValueError(f"Error fetching unfinished jobs: {str(e)}")
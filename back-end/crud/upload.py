@@ -1,28 +1,55 @@
-from utils.helper import execute_fetch_query, execute_insert_or_update_query
+from utils.helper import execute_fetch_query, execute_insert_or_update_query, execute_insert_many_query
+import sqlite3
 import uuid
+
+FILE_COLUMNS = "id, user_id, file_name, file_token, file_type, file_path, file_hash"
+
 class FileCrud():
     def __init__(self):
         pass
-    def add_file(self, file_id, file_name, file_type, file_path, user_id):
+    def add_file(self, file_id, file_name, file_type, file_path, user_id, file_hash=None):
         """
-        Add a new file to the database.
+        Add a new file to the database. Raises sqlite3.IntegrityError if the user already
+        has a file with the same hash.
         """
         try:
-            file_id = str(uuid.uuid4())
-            query = "INSERT INTO file_uploads (id, user_id, file_name, file_token, file_type, file_path) VALUES (?, ?, ?, ?, ?, ?)"
-            params = (file_id, user_id, file_name, 0, file_type, str(file_path))
+            file_id = file_id or str(uuid.uuid4())
+            query = "INSERT INTO file_uploads (id, user_id, file_name, file_token, file_type, file_path, file_hash) VALUES (?, ?, ?, ?, ?, ?, ?)"
+            params = (file_id, user_id, file_name, 0, file_type, str(file_path), file_hash)
             result = execute_insert_or_update_query(query, params)
             
             return True if result else False
+        except sqlite3.IntegrityError:
+            raise
         except Exception as e:
             raise ValueError(f"Error adding file {file_name}: {str(e)}")
+    def add_files(self, files):
+        """
+        Add many files to the database in one transaction.
+        `files` holds (file_id, file_name, file_type, file_path, user_id, file_hash) tuples.
+        Nothing is added, and sqlite3.IntegrityError is raised, if any of them is a duplicate.
+        """
+        try:
+            query = "INSERT INTO file_uploads (id, user_id, file_name, file_token, file_type, file_path, file_hash) VALUES (?, ?, ?, ?, ?, ?, ?)"
+            params_list = [
+                (file_id, user_id, file_name, 0, file_type, str(file_path), file_hash)
+                for file_id, file_name, file_type, file_path, user_id, file_hash in files
+            ]
+            result = execute_insert_many_query(query, params_list)
+
+            return result == len(params_list)
+        except sqlite3.IntegrityError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error adding {len(files)} files: {str(e)}")
+
     @staticmethod
     def get_files_by_userid(user_id):
         """
         Fetch files by user ID.
         """
         try:
-            query = "SELECT * FROM file_uploads WHERE user_id = ?"
+            query = f"SELECT {FILE_COLUMNS} FROM file_uploads WHERE user_id = ?"
             params = (user_id,)
             result = execute_fetch_query(query, params)
             
@@ -54,4 +81,44 @@ class FileCrud():
             
             return result[0][0] if result else None
         except Exception as e:
-            raise ValueError(f"Error fetching user ID for file ID {file_id}: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error fetching user ID for file ID {file_id}: {str(e)}")
+
+    def get_file_by_id(self, file_id):
+        """
+        Fetch a single file by its ID.
+        """
+        try:
+            query = f"SELECT {FILE_COLUMNS} FROM file_uploads WHERE id = ?"
+            params = (file_id,)
+            result = execute_fetch_query(query, params)
+
+            return result[0] if result else None
+        except Exception as e:
+            raise ValueError(f"Error fetching file with ID {file_id}: {str(e)}")
+
+    def get_file_id_by_hash(self, user_id, file_hash):
+        """
+        Find the user's file with the given SHA-256, if they already uploaded it.
+        """
+        try:
+            query = "SELECT id FROM file_uploads WHERE user_id = ? AND file_hash = ? LIMIT 1"
+            params = (user_id, file_hash)
+            result = execute_fetch_query(query, params)
+
+            return result[0][0] if result else None
+        except Exception as e:
+            raise ValueError(f"Error looking up file by hash for user ID {user_id}: {str(e)}")
+
+    @staticmethod
+    def update_file_token(file_id, file_token):
+        """
+        Record the token count of a file.
+        """
+        try:
+            query = "UPDATE file_uploads SET file_token = ? WHERE id = ?"
+            params = (file_token, file_id)
+            result = execute_insert_or_update_query(query, params)
+
+            return True if result else False
+        except Exception as e:
+            raise ValueError(f"Error updating token count of file {file_id}: {str(e)}")
@@ -0,0 +1,63 @@
+"""
+Bulk-ingest a directory tree or zip archive into a user's collection.
+
+Every supported file is stored, registered in one transaction and indexed in a single pass,
+exactly as the bulk upload endpoint does; files the user already has are skipped.
+
+Run from the back-end folder:
+    python ingest.py --user-id <user id> path/to/folder archive.zip more.pdf
+"""
+import argparse
+import json
+import mimetypes
+import os
+import zipfile
+from pathlib import Path
+
+from services.upload import FileUploadService
+from utils.text_extraction import shutdown_extraction_executor
+
+DEFAULT_EXTENSIONS = [".pdf", ".html", ".htm"]
+
+
+def iter_sources(paths, extensions):
+    """Yields (file name, content type, file object, size) for every matching file under `paths`."""
+    for path in map(Path, paths):
+        if path.is_dir():
+            candidates = sorted(candidate for candidate in path.rglob("*") if candidate.is_file())
+            yield from iter_sources(candidates, extensions)
+        elif path.suffix.lower() == ".zip":
+            with zipfile.ZipFile(path) as archive:
+                for member in archive.infolist():
+                    if member.is_dir() or Path(member.filename).suffix.lower() not in extensions:
+                        continue
+                    with archive.open(member) as source:
+                        yield Path(member.filename).name, mimetypes.guess_type(member.filename)[0], source, member.file_size
+        elif path.suffix.lower() in extensions:
+            with open(path, "rb") as source:
+                yield path.name, mimetypes.guess_type(path.name)[0], source, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="files, directories or .zip archives")
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--extensions", nargs="+", default=DEFAULT_EXTENSIONS,
+                        help="file extensions to ingest (default: %(default)s)")
+    args = parser.parse_args()
+
+    extensions = {extension.lower() if extension.startswith(".") else f".{extension.lower()}"
+                  for extension in args.extensions}
+    service = FileUploadService()
+    try:
+        # The indexing job runs right here rather than on the background queue, so it is done when this exits.
+        result = service.add_files(iter_sources(args.paths, extensions), args.user_id, background=False)
+    finally:
+        shutdown_extraction_executor()
+    print(json.dumps(result, indent=2))
+    if result and result["job_id"]:
+        print(json.dumps(service.get_job_by_id(result["job_id"]).model_dump(), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
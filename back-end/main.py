@@ -1,14 +1,34 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from api import chats, conversations, health, upload, users
 from config import settings
 from utils.logger import setup_logging
+from utils.metrics import render_metrics
+from utils.job_queue import indexing_queue
+from utils.reranker import reranker
+from utils.request_limits import BodySizeLimitMiddleware
+from utils.text_extraction import shutdown_extraction_executor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pick up indexing jobs that were interrupted by the last shutdown.
+    upload.file_management_process.jobs.resume_unfinished_jobs()
+    if settings.RERANK_ENABLED:
+        # Load the ONNX model now rather than on the first question, where it would blow the latency budget.
+        reranker.model
+    yield
+    indexing_queue.shutdown()
+    shutdown_extraction_executor()
+
 
 def create_app() -> FastAPI:
     app = FastAPI(
         title=settings.APP_NAME,
         description=settings.APP_DESCRIPTION,
-        version=settings.APP_VERSION
+        version=settings.APP_VERSION,
+        lifespan=lifespan
     )
 
     # Setup logging
@@ -23,6 +43,9 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Stop oversized uploads while they arrive, before Starlette spools them to disk
+    app.add_middleware(BodySizeLimitMiddleware, limits=upload.BODY_LIMITS)
+
     # Include routers
     app.include_router(chats.router)
     app.include_router(conversations.router)
@@ -34,6 +57,12 @@ def create_app() -> FastAPI:
     async def root():
         return {"message": f"{settings.APP_NAME} is running", "status": "healthy"}
 
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus scrape endpoint: chat and indexing stage latency histograms."""
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+
     return app
 
 app = create_app()
@@ -0,0 +1,145 @@
+"""
+Qdrant collection maintenance.
+
+    sync     applies the current QDRANT_* collection settings (payload indexes, quantization,
+             on-disk vectors and payloads, HNSW parameters) to existing collections
+    migrate  copies per-user collections into the shared collection, tagging every point with
+             its user, and verifies the point counts; --delete-source drops the copied collections
+    rebuild  re-indexes every file of the given users from scratch, e.g. after changing the
+             chunker or embedding model; stored text is reused, so files are not parsed again
+
+Migrating is idempotent (point ids are kept), so it can be re-run for files indexed meanwhile.
+Switch QDRANT_COLLECTION_MODE to "shared" once it has finished. Until then, sync treats the
+shared collection like any other unless --shared is given.
+
+Run from the back-end folder:
+    python manage_collections.py sync                       # every collection
+    python manage_collections.py sync <user id>_collection  # only these
+    python manage_collections.py sync --shared shared_collection  # before switching the mode
+    python manage_collections.py migrate --delete-source    # every per-user collection
+    python manage_collections.py rebuild <user id> ...
+"""
+import argparse
+
+from qdrant_client import models
+
+from config import settings
+from utils.data_indexing_pipeline import rebuild_vector_store
+from utils.vector_store import (
+    call_with_retries, collection_config, ensure_payload_indexes, get_qdrant_client, sync_collection_config,
+    tenant_condition
+)
+
+USER_COLLECTION_SUFFIX = "_collection"
+
+
+def sync(collection_names, shared=None):
+    client = get_qdrant_client()
+    if not collection_names:
+        collection_names = [collection.name for collection in call_with_retries(client.get_collections).collections]
+    failed = 0
+    for collection_name in collection_names:
+        try:
+            sync_collection_config(client, collection_name, shared)
+            print(f"synced {collection_name}")
+        except Exception as e:
+            failed += 1
+            print(f"failed {collection_name}: {e}")
+    print(f"{len(collection_names) - failed}/{len(collection_names)} collections synced")
+    return failed == 0
+
+
+def migrate_collection(client, source: str, target: str, batch_size: int) -> int:
+    """Copies every point of the per-user collection `source` into `target`; returns the number copied."""
+    user_id = source[:-len(USER_COLLECTION_SUFFIX)]
+    copied = 0
+    offset = None
+    while True:
+        records, offset = call_with_retries(
+            client.scroll, collection_name=source, limit=batch_size, offset=offset,
+            with_payload=True, with_vectors=True
+        )
+        if records:
+            call_with_retries(client.upsert, collection_name=target, wait=True, points=[
+                models.PointStruct(id=record.id, vector=record.vector, payload={**record.payload, "user_id": user_id})
+                for record in records
+            ])
+            copied += len(records)
+        if offset is None:
+            return copied
+
+
+def migrate(collection_names, batch_size: int, delete_source: bool):
+    client = get_qdrant_client()
+    target = settings.QDRANT_SHARED_COLLECTION
+    if not call_with_retries(client.collection_exists, target):
+        print(f"creating {target}")
+        call_with_retries(client.create_collection, collection_name=target, **collection_config(target, shared=True))
+    ensure_payload_indexes(client, target, shared=True)
+
+    if not collection_names:
+        collection_names = [
+            collection.name for collection in call_with_retries(client.get_collections).collections
+            if collection.name.endswith(USER_COLLECTION_SUFFIX) and collection.name != target
+        ]
+    failed = 0
+    for source in collection_names:
+        try:
+            copied = migrate_collection(client, source, target, batch_size)
+            user_id = source[:-len(USER_COLLECTION_SUFFIX)]
+            expected = call_with_retries(client.count, collection_name=source, exact=True).count
+            migrated = call_with_retries(
+                client.count, collection_name=target, exact=True,
+                count_filter=models.Filter(must=[tenant_condition(user_id)])
+            ).count
+            if migrated < expected:
+                raise ValueError(f"only {migrated} of {expected} points are in {target}")
+            if delete_source:
+                call_with_retries(client.delete_collection, collection_name=source)
+            print(f"migrated {source}: {copied} points{', source dropped' if delete_source else ''}")
+        except Exception as e:
+            failed += 1
+            print(f"failed {source}: {e}")
+    print(f"{len(collection_names) - failed}/{len(collection_names)} collections migrated into {target}")
+    return failed == 0
+
+
+def rebuild(user_ids):
+    failed = 0
+    for user_id in user_ids:
+        if rebuild_vector_store(user_id):
+            print(f"rebuilt {user_id}")
+        else:
+            failed += 1
+            print(f"failed {user_id}")
+    print(f"{len(user_ids) - failed}/{len(user_ids)} users rebuilt")
+    return failed == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    sync_parser = commands.add_parser("sync", help="apply the collection settings to existing collections")
+    sync_parser.add_argument("collections", nargs="*", help="collection names (default: all)")
+    sync_parser.add_argument("--shared", action="store_true", default=None,
+                             help="apply the shared collection settings, whatever QDRANT_COLLECTION_MODE is")
+    migrate_parser = commands.add_parser("migrate", help="move per-user collections into the shared collection")
+    migrate_parser.add_argument("collections", nargs="*",
+                                help=f"per-user collection names (default: every *{USER_COLLECTION_SUFFIX})")
+    migrate_parser.add_argument("--batch-size", type=int, default=256, help="points copied per request")
+    migrate_parser.add_argument("--delete-source", action="store_true",
+                                help="drop each per-user collection once its points are verified in the shared one")
+    rebuild_parser = commands.add_parser("rebuild", help="re-index every file of the given users")
+    rebuild_parser.add_argument("user_ids", nargs="+", help="users whose index is rebuilt")
+    args = parser.parse_args()
+
+    if args.command == "sync":
+        raise SystemExit(0 if sync(args.collections, args.shared) else 1)
+    if args.command == "migrate":
+        raise SystemExit(0 if migrate(args.collections, args.batch_size, args.delete_source) else 1)
+    if args.command == "rebuild":
+        raise SystemExit(0 if rebuild(args.user_ids) else 1)
+
+
+if __name__ == "__main__":
+    main()
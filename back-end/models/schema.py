@@ -15,6 +15,7 @@ class FileUpload(BaseModel):
     file_token: int
     file_type: str
     file_path: str
+    file_hash: Optional[str] = None
 
 class Conversation(BaseModel):
     id: str
@@ -25,4 +26,18 @@ class Chat(BaseModel):
     id: str
     conversation_id: str
     content: str
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class IndexingJob(BaseModel):
+    id: str
+    user_id: str
+    kind: str
+    status: str
+    file_ids: List[str]
+    total_files: int
+    files_processed: int
+    chunks_embedded: int
+    chunks_upserted: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
@@ -1,70 +1,205 @@
+import asyncio
+import logging
+import weakref
 from crud.chats import ChatCrud
-from utils.rag_pipeline import query_with_gemini_generation_stream, prompt_expansion, create_chat_name, query_with_gemini_generation
+from config import settings
+from utils.answer_cache import answer_cache
+from utils.query_cache import embed_query_dense, embed_query_sparse
+from utils.conversation_memory import ConversationMemory, format_turn
+from utils.rag_pipeline import query_with_gemini_generation_stream, prompt_expansion, create_chat_name, query_with_gemini_generation, summarize_conversation
+from utils.timing import StageTimer
+from utils.vector_store import collection_for_user
 import json
 
+logger = logging.getLogger(__name__)
+
 class ChatService:
     def __init__(self):
         self.chats = []
+        # Strong references to fire-and-forget tasks, so they are not garbage-collected mid-flight.
+        self.background_tasks = set()
+        self.memory_locks = weakref.WeakValueDictionary()
 
-    def get_chats_by_id(self, conversation_id: str):
+    async def get_chats_by_id(self, conversation_id: str):
         try:
-            chats_history = ChatCrud.get_chats_by_id(self, conversation_id)
+            chats_history = await ChatCrud.get_chats_by_id(self, conversation_id)
             if not chats_history:
                 return []
             return chats_history
         except Exception as e:
             raise ValueError(f"Error fetching chats for conversation ID {conversation_id}: {str(e)}")
 
-    def add_chat_and_generate_response_stream(self, conversation_id: str, message: str):
-        """Generator function that yields streaming response chunks."""
+    def run_in_background(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def update_conversation_title(self, conversation_id: str, conversation_context: str):
         try:
-            chat_history = ChatCrud.get_chats_by_id(self, conversation_id)
-            print("chat_history:", chat_history)
-            og_message = message
-            
-            if chat_history:
-                conversation_name = create_chat_name(chat_history)
-                message = prompt_expansion(message, chat_history)
-                print(f"Expanded message: {message}")
-                ChatCrud.update_conversation_name(self, conversation_id, conversation_name)
-
-            user_id = ChatCrud.get_user_id_by_conversation_id(self, conversation_id)
-            collection_name = f"{user_id}_collection"
-            print(f"Using collection: {collection_name} for user ID: {user_id}*************")
+            conversation_name = await create_chat_name(conversation_context)
+            await ChatCrud.update_conversation_name(self, conversation_id, conversation_name)
+        except Exception as e:
+            logger.error(f"Error updating title of conversation {conversation_id}: {e}")
+
+    def schedule_title_update(self, conversation_id: str, memory: ConversationMemory):
+        """Names the conversation in the background; the title settles after the first few turns."""
+        if not memory or memory.summary or memory.turn_count >= settings.CHAT_TITLE_MAX_TURNS:
+            return
+        self.run_in_background(self.update_conversation_title(conversation_id, memory.render()))
+
+    async def load_memory(self, conversation_id: str) -> ConversationMemory:
+        """The conversation's rolling summary plus the turns not yet folded into it, within the token budget."""
+        summary, summarized_until = await ChatCrud.get_conversation_memory(self, conversation_id)
+        rows = await ChatCrud.get_recent_chats(
+            self, conversation_id, settings.CHAT_MEMORY_RECENT_TURNS + settings.CHAT_MEMORY_SUMMARIZE_EVERY,
+            summarized_until
+        )
+        return ConversationMemory(summary, [format_turn(content) for content, _ in rows])
+
+    async def update_memory(self, conversation_id: str):
+        """
+        Folds the oldest unsummarized turns into the summary once more than
+        CHAT_MEMORY_RECENT_TURNS + CHAT_MEMORY_SUMMARIZE_EVERY of them have piled up,
+        so each update summarizes a fixed number of turns.
+        """
+        lock = self.memory_locks.setdefault(conversation_id, asyncio.Lock())
+        async with lock:
+            try:
+                summary, summarized_until = await ChatCrud.get_conversation_memory(self, conversation_id)
+                pending = await ChatCrud.get_oldest_chats(
+                    self, conversation_id, settings.CHAT_MEMORY_RECENT_TURNS + settings.CHAT_MEMORY_SUMMARIZE_EVERY,
+                    summarized_until
+                )
+                if len(pending) < settings.CHAT_MEMORY_RECENT_TURNS + settings.CHAT_MEMORY_SUMMARIZE_EVERY:
+                    return
+                folded = pending[:settings.CHAT_MEMORY_SUMMARIZE_EVERY]
+                new_summary = await summarize_conversation(summary, [format_turn(content) for content, _ in folded])
+                if new_summary is None:
+                    return
+                await ChatCrud.save_conversation_memory(self, conversation_id, new_summary, folded[-1][1])
+            except Exception as e:
+                logger.error(f"Error updating memory of conversation {conversation_id}: {e}")
+
+    async def save_turn(self, conversation_id: str, message: str, response: str) -> bool:
+        saved = await ChatCrud.add_chat(self, conversation_id, message, response)
+        if saved:
+            self.run_in_background(self.update_memory(conversation_id))
+        return saved
+
+    async def prepare_query(self, conversation_id: str, message: str, timer: StageTimer):
+        """
+        Everything that has to happen before retrieval. Returns (user_id, search query,
+        sparse embedding of the search query or None).
+
+        The memory and user lookups run together; query expansion runs alongside the BM25
+        embedding of the original message, which keyword search uses as-is.
+        """
+        memory, user_id = await timer.track("history", asyncio.gather(
+            self.load_memory(conversation_id),
+            ChatCrud.get_user_id_by_conversation_id(self, conversation_id)
+        ))
+        if not memory:
+            return user_id, message, None
+        logger.debug("Conversation memory: %d tokens, %d recent turn(s)", memory.tokens, len(memory.turns))
+
+        self.schedule_title_update(conversation_id, memory)
+        expanded_message, query_sparse_embedding = await asyncio.gather(
+            timer.track("expansion", prompt_expansion(message, memory.render())),
+            timer.track("sparse_query_embedding", embed_query_sparse(message))
+        )
+        logger.debug("Expanded message: %s", expanded_message)
+        return user_id, expanded_message, query_sparse_embedding
+
+    async def lookup_cached_answer(self, user_id: str, query: str):
+        """
+        Look up a previously generated answer for a near-identical query against the
+        unchanged collection. Returns (cached answer or None, collection version, query embedding)
+        so a fresh answer can be stored under the same version and embedding.
+        """
+        if not settings.ANSWER_CACHE_ENABLED:
+            return None, None, None
+        try:
+            version = await ChatCrud.get_collection_version(self, user_id)
+        except Exception as e:
+            logger.warning(f"Answer cache disabled for this request: {e}")
+            return None, None, None
+        # Shares the query-embedding cache with retrieval, so this adds no extra embedding call.
+        query_embedding = await embed_query_dense(query)
+        cached = answer_cache.lookup(user_id, version, query_embedding)
+        if cached:
+            logger.info("Serving cached answer (similarity %.3f) for query: %s", cached.similarity, query)
+        return cached, version, query_embedding
+
+    async def add_chat_and_generate_response_stream(self, conversation_id: str, og_message: str):
+        """Generator function that yields streaming response chunks. The final chunk carries per-stage timings."""
+        try:
+            timer = StageTimer()
+            user_id, message, query_sparse_embedding = await self.prepare_query(conversation_id, og_message, timer)
+            collection_name = collection_for_user(user_id)
+            logger.debug("Using collection %s for user %s", collection_name, user_id)
+
+            cached, version, query_embedding = await timer.track(
+                "answer_cache", self.lookup_cached_answer(user_id, message)
+            )
+            if cached:
+                yield {"content": cached.answer, "type": "content", "done": False}
+                yield {"content": "", "type": "done", "done": True,
+                       "retrieved_documents": cached.chunk_ids, "cached": True, "timings": timer.summary()}
+                await self.save_turn(conversation_id, og_message, cached.answer)
+                return
             
             # Stream the response
             full_response = ""
-            for chunk in query_with_gemini_generation_stream(message, collection_name):
-                if chunk.get("content"):
+            retrieved_documents = []
+            failed = False
+            async for chunk in query_with_gemini_generation_stream(
+                message, collection_name, query_sparse_embedding=query_sparse_embedding, timer=timer, user_id=user_id
+            ):
+                if chunk.get("type") == "error":
+                    failed = True
+                elif chunk.get("content"):
                     full_response += chunk["content"]
+                if chunk.get("done"):
+                    retrieved_documents = chunk.get("retrieved_documents", [])
+                    logger.debug("Chat turn timings (ms): %s", chunk.get("timings"))
                 yield chunk
             
             # Save the complete response to database
             if full_response:
-                ChatCrud.add_chat(self, conversation_id, og_message, full_response)
+                await self.save_turn(conversation_id, og_message, full_response)
+                # An answer drawn from no documents says nothing about the collection, so it is not reused.
+                if not failed and retrieved_documents:
+                    answer_cache.store(user_id, version, query_embedding, message, retrieved_documents, full_response)
                 
         except Exception as e:
             yield {"error": f"Error adding chat for conversation ID {conversation_id}: {str(e)}"}
 
     # Keep original method for compatibility
-    def add_chat_and_generate_response(self, conversation_id: str, message: str):
+    async def add_chat_and_generate_response(self, conversation_id: str, og_message: str, timer: StageTimer = None):
+        """Returns the generated response; `timer` receives the per-stage latency breakdown."""
         try:
-            chat_history = ChatCrud.get_chats_by_id(self, conversation_id)
-            print("chat_history:", chat_history)
-            og_message = message
-            if chat_history:
-                conversation_name = create_chat_name(chat_history)
-                message = prompt_expansion(message, chat_history)
-                print(f"Expanded message: {message}")
-                ChatCrud.update_conversation_name(self, conversation_id, conversation_name)
-
-            user_id = ChatCrud.get_user_id_by_conversation_id(self, conversation_id)
-            collection_name = f"{user_id}_collection"
-            print(f"Using collection: {collection_name} for user ID: {user_id}*************")
+            timer = timer or StageTimer()
+            user_id, message, query_sparse_embedding = await self.prepare_query(conversation_id, og_message, timer)
+            collection_name = collection_for_user(user_id)
+            logger.debug("Using collection %s for user %s", collection_name, user_id)
             
-            resp = query_with_gemini_generation(message, collection_name)
-            print(f"Generated response: {resp}")
-            if ChatCrud.add_chat(self, conversation_id, og_message, resp.get("generated_response")):
+            cached, version, query_embedding = await timer.track(
+                "answer_cache", self.lookup_cached_answer(user_id, message)
+            )
+            if cached:
+                if await self.save_turn(conversation_id, og_message, cached.answer):
+                    return cached.answer
+                return None
+
+            resp = await query_with_gemini_generation(
+                message, collection_name, query_sparse_embedding=query_sparse_embedding, timer=timer, user_id=user_id
+            )
+            logger.debug("Generated response: %s", resp)
+            logger.debug("Chat turn timings (ms): %s", timer.stages)
+            if not resp.get("error") and resp.get("retrieved_documents"):
+                answer_cache.store(user_id, version, query_embedding, message,
+                                   resp.get("retrieved_documents", []), resp.get("generated_response"))
+            if await self.save_turn(conversation_id, og_message, resp.get("generated_response")):
                 return resp.get("generated_response")
             return None
         except Exception as e:
@@ -0,0 +1,141 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from crud.jobs import JobCrud
+from crud.upload import FileCrud
+from models.schema import IndexingJob
+from utils.data_indexing_pipeline import add_files_to_vector_store, remove_data_from_vector_store
+from utils.job_queue import indexing_queue, worker_lock
+from utils.answer_cache import answer_cache
+from utils.metrics import INDEXING_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class JobProgress:
+    """Accumulates progress of a running job and writes it to the database."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.files_processed = 0
+        self.chunks_embedded = 0
+        self.chunks_upserted = 0
+        self._lock = threading.Lock()
+
+    def update(self, embedded: int = 0, upserted: int = 0, files: int = 0):
+        # Called from both the embedding thread and the upsert thread of the pipeline.
+        with self._lock:
+            self.chunks_embedded += embedded
+            self.chunks_upserted += upserted
+            self.files_processed += files
+            JobCrud.update_job_progress(self, self.job_id, self.files_processed,
+                                        self.chunks_embedded, self.chunks_upserted)
+
+
+class IndexingJobService:
+    def __init__(self):
+        pass
+
+    def enqueue_job(self, user_id: str, kind: str, file_ids: list):
+        """
+        Register a job and queue it on the background indexing workers.
+        """
+        job_id = self.create_job(user_id, kind, file_ids)
+        if job_id:
+            indexing_queue.submit(user_id, lambda: self.run_job(job_id, user_id, kind, file_ids))
+        return job_id
+
+    def create_job(self, user_id: str, kind: str, file_ids: list):
+        """
+        Register a job without queueing it, for callers that run it themselves.
+        """
+        try:
+            job_id = str(uuid.uuid4())
+            if not JobCrud.add_job(self, job_id, user_id, kind, file_ids):
+                return None
+            # The user's files are about to change, so previously cached answers may be stale.
+            answer_cache.invalidate(user_id)
+            return job_id
+        except Exception as e:
+            raise ValueError(f"Error queueing {kind} job for user ID {user_id}: {str(e)}")
+
+    def run_job(self, job_id: str, user_id: str, kind: str, file_ids: list):
+        """
+        Run a queued job on a background worker and record its outcome. Every server process
+        may try to run the same queued job; only the one that claims it does.
+        """
+        if not JobCrud.claim_job(self, job_id, worker_lock.acquire()):
+            logger.info("Job %s was claimed by another worker, skipping it", job_id)
+            return
+        progress = JobProgress(job_id)
+        failed = []
+        started = time.perf_counter()
+        try:
+            if kind == "index":
+                # Files may have been deleted while the job was waiting.
+                files = [file for file in (FileCrud.get_file_by_id(self, file_id) for file_id in file_ids) if file]
+                progress.update(files=len(file_ids) - len(files))
+                if files and not add_files_to_vector_store(user_id, [(file[0], file[5]) for file in files],
+                                                           progress=progress.update):
+                    failed.extend(file[0] for file in files)
+            else:
+                for file_id in file_ids:
+                    if not remove_data_from_vector_store(user_id, file_id):
+                        failed.append(file_id)
+                    progress.update(files=1)
+        except Exception as e:
+            JobCrud.update_job_status(self, job_id, "failed", str(e))
+            return
+        finally:
+            answer_cache.invalidate(user_id)
+            INDEXING_STAGE_SECONDS.labels(stage=f"{kind}_job").observe(time.perf_counter() - started)
+        if failed:
+            JobCrud.update_job_status(self, job_id, "failed", f"Could not {kind} files: {', '.join(failed)}")
+        else:
+            JobCrud.update_job_status(self, job_id, "completed")
+
+    def get_job_by_id(self, job_id: str):
+        """
+        Fetch a job's status and progress.
+        """
+        try:
+            job = JobCrud.get_job_by_id(self, job_id)
+            if not job:
+                return None
+            return IndexingJob(
+                id=job[0],
+                user_id=job[1],
+                kind=job[2],
+                status=job[3],
+                file_ids=json.loads(job[4]),
+                total_files=job[5],
+                files_processed=job[6],
+                chunks_embedded=job[7],
+                chunks_upserted=job[8],
+                error=job[9],
+                created_at=job[10],
+                updated_at=job[11]
+            )
+        except Exception as e:
+            raise ValueError(f"Error fetching job {job_id}: {str(e)}")
+
+    def resume_unfinished_jobs(self):
+        """
+        Re-queue jobs that were queued, or running in a process that has since stopped.
+        Jobs still running in another live server process are left alone.
+        """
+        try:
+            resumed = 0
+            for job in JobCrud.get_unfinished_jobs(self):
+                job_id, user_id, kind, status, file_ids, worker = job[0], job[1], job[2], job[3], json.loads(job[4]), job[5]
+                if status == "running":
+                    if worker_lock.is_alive(worker) or not JobCrud.requeue_orphaned_job(self, job_id, worker):
+                        continue
+                indexing_queue.submit(user_id, lambda job_id=job_id, user_id=user_id, kind=kind, file_ids=file_ids:
+                                      self.run_job(job_id, user_id, kind, file_ids))
+                resumed += 1
+            return resumed
+        except Exception as e:
+            raise ValueError(f"Error resuming unfinished jobs: {str(e)}")
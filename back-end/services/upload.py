@@ -1,48 +1,180 @@
-import shutil
+import hashlib
+import logging
+import os
+import sqlite3
 import uuid
 from crud.upload import FileCrud
 from pathlib import Path
+from config import settings
 from models.schema import FileUpload
 
-from utils.data_indexing_pipeline import add_data_to_vector_store
+from services.jobs import IndexingJobService
+
+logger = logging.getLogger(__name__)
 
 UPLOAD_DIR = Path("data")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class DuplicateFileError(ValueError):
+    def __init__(self, file_id):
+        super().__init__(f"This file was already uploaded (file ID {file_id})")
+        self.file_id = file_id
+
+
+def stream_to_disk(source, destination: Path, max_bytes: int = settings.UPLOAD_MAX_BYTES,
+                   chunk_bytes: int = settings.UPLOAD_CHUNK_BYTES) -> str:
+    """
+    Copies a file object to `destination` a chunk at a time and returns its SHA-256.
+    Memory use is one chunk regardless of the file's size; the copy is abandoned as soon
+    as it grows past `max_bytes`. For API uploads `source` is Starlette's spooled copy of the
+    request body, whose size BodySizeLimitMiddleware already caps while it is received.
+    """
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(destination, "wb") as buffer:
+            while chunk := source.read(chunk_bytes):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLargeError(f"File exceeds the upload limit of {max_bytes} bytes")
+                digest.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    return digest.hexdigest()
+
 class FileUploadService():
     def __init__(self):
-        pass
+        self.jobs = IndexingJobService()
+
+    def save_file(self, user_id, file_id, file_name, source, size=None, batch_hashes=None):
+        """
+        Streams one file into the user's upload folder. Returns (file name, location, SHA-256).
+        The file is stored as "<file_id>_<file name>", so files sharing a name never overwrite each other.
+        Raises UploadTooLargeError past UPLOAD_MAX_BYTES, and DuplicateFileError when the user
+        already has a file with the same content, either stored or earlier in `batch_hashes`.
+        """
+        if size is not None and size > settings.UPLOAD_MAX_BYTES:
+            raise UploadTooLargeError(f"File exceeds the upload limit of {settings.UPLOAD_MAX_BYTES} bytes")
+
+        file_location = UPLOAD_DIR / user_id
+        if not file_location.exists():
+            file_location.mkdir(parents=True, exist_ok=True)
+
+        # Only the base name, so a crafted filename cannot write outside the user's folder.
+        file_name = Path(file_name).name
+        file_location = file_location / f"{file_id}_{file_name}"
+        partial_location = file_location.with_name(f".{uuid.uuid4()}.part")
+
+        logger.debug("File location: %s", file_location)
+        file_hash = stream_to_disk(source, partial_location)
+        try:
+            existing_file_id = (batch_hashes or {}).get(file_hash) or FileCrud.get_file_id_by_hash(self, user_id, file_hash)
+            if existing_file_id:
+                raise DuplicateFileError(existing_file_id)
+            os.replace(partial_location, file_location)
+        finally:
+            partial_location.unlink(missing_ok=True)
+        logger.debug("File saved at: %s", file_location)
+        return file_name, file_location, file_hash
 
     def add_file(self, file, user_id):
         """
-        adding a file to the database.
+        adding a file to the database and queueing it for indexing. Returns the indexing job ID.
+        Files that are too large or duplicates are neither stored nor indexed (see `save_file`).
         """
         try:
             if not file or not user_id:
-                return False
-            
-            file_location = UPLOAD_DIR / user_id
-            if not file_location.exists():
-                file_location.mkdir(parents=True, exist_ok=True)
-            
-            file_location = file_location / file.filename
-
-            print(f"File location: {file_location}")
-            contents = file.read()
-            with open(file_location, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-
-            print(f"File saved at: {file_location}")
-            
+                return None
             file_id = str(uuid.uuid4())
-            if FileCrud.add_file(self, file_id, file.filename, file.content_type, file_location, user_id):
-                add_data_to_vector_store(user_id)
-                return True
-            print("Crud was also successful")
-            return False
+            file_name, file_location, file_hash = self.save_file(user_id, file_id, file.filename, file.file, file.size)
+
+            try:
+                added = FileCrud.add_file(self, file_id, file_name, file.content_type, file_location, user_id, file_hash)
+            except sqlite3.IntegrityError:
+                # An identical upload in flight at the same time was recorded first.
+                file_location.unlink(missing_ok=True)
+                raise DuplicateFileError(FileCrud.get_file_id_by_hash(self, user_id, file_hash))
+            if added:
+                logger.debug("File %s recorded for user %s", file_id, user_id)
+                return self.jobs.enqueue_job(user_id, "index", [file_id])
+            return None
+        except (UploadTooLargeError, DuplicateFileError):
+            raise
         except Exception as e:
             raise ValueError(f"Error adding file {file.filename}: {str(e)}")
 
+    def add_files(self, sources, user_id, background=True):
+        """
+        adding many files at once: every new file is registered in one transaction and all of them
+        are indexed by a single job. `sources` yields (file name, content type, file object, size or None).
+        Returns the job ID (None if nothing new was stored) with per-file outcomes. With
+        `background=False` the job runs in the calling thread, for command-line ingestion.
+        """
+        try:
+            if not user_id:
+                return None
+            rows, duplicates, rejected = [], [], []
+            batch_hashes = {}
+            for file_name, content_type, source, size in sources:
+                file_id = str(uuid.uuid4())
+                try:
+                    file_name, file_location, file_hash = self.save_file(user_id, file_id, file_name, source, size,
+                                                                         batch_hashes)
+                except DuplicateFileError as e:
+                    duplicates.append({"file_name": file_name, "file_id": e.file_id})
+                    continue
+                except UploadTooLargeError as e:
+                    rejected.append({"file_name": file_name, "reason": str(e)})
+                    continue
+                batch_hashes[file_hash] = file_id
+                rows.append((file_id, file_name, content_type or "application/octet-stream", file_location, user_id, file_hash))
+
+            try:
+                added = bool(rows) and FileCrud.add_files(self, rows)
+            except sqlite3.IntegrityError:
+                # Identical uploads in flight at the same time were recorded first; add the rest one by one.
+                rows, added = self._add_files_individually(rows, user_id, duplicates), True
+
+            job_id = None
+            if rows and added:
+                file_ids = [row[0] for row in rows]
+                if background:
+                    job_id = self.jobs.enqueue_job(user_id, "index", file_ids)
+                else:
+                    job_id = self.jobs.create_job(user_id, "index", file_ids)
+                    self.jobs.run_job(job_id, user_id, "index", file_ids)
+            return {
+                "job_id": job_id,
+                "files": [{"file_name": row[1], "file_id": row[0]} for row in rows],
+                "duplicates": duplicates,
+                "rejected": rejected
+            }
+        except Exception as e:
+            raise ValueError(f"Error adding files for user ID {user_id}: {str(e)}")
+
+    def _add_files_individually(self, rows, user_id, duplicates):
+        """
+        Records the rows one at a time, moving those that turn out to be duplicates to `duplicates`.
+        Returns the rows that were recorded.
+        """
+        added = []
+        for row in rows:
+            file_id, file_name, content_type, file_location, _, file_hash = row
+            try:
+                FileCrud.add_file(self, file_id, file_name, content_type, file_location, user_id, file_hash)
+                added.append(row)
+            except sqlite3.IntegrityError:
+                file_location.unlink(missing_ok=True)
+                duplicates.append({"file_name": file_name, "file_id": FileCrud.get_file_id_by_hash(self, user_id, file_hash)})
+        return added
+
     def get_files_by_user_id(self, user_id):
         """
         fetching files by user ID.
@@ -60,7 +192,8 @@ class FileUploadService():
                         file_name=file[2],
                         file_token=file[3],
                         file_type=file[4],
-                        file_path=file[5]
+                        file_path=file[5],
+                        file_hash=file[6]
                     ) 
                     for file in files
                 ]
@@ -76,10 +209,22 @@ class FileUploadService():
             if not file_id:
                 return False
 
+            user_id = FileCrud.get_user_id_by_file_id(self, file_id)
             if FileCrud.delete_file(self, file_id):
-                user_id = FileCrud.get_user_id_by_file_id(self, file_id)
-                add_data_to_vector_store(user_id)
+                if user_id:
+                    self.jobs.enqueue_job(user_id, "remove", [file_id])
                 return True
             return False
         except Exception as e:
-            raise ValueError(f"Error deleting file with ID {file_id}: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error deleting file with ID {file_id}: {str(e)}")
+
+    def get_job_by_id(self, job_id):
+        """
+        fetching an indexing job by its ID.
+        """
+        try:
+            if not job_id:
+                return None
+            return self.jobs.get_job_by_id(job_id)
+        except Exception as e:
+            raise ValueError(f"Error fetching job with ID {job_id}: {str(e)}")
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import create_engine, Column, String, Integer, Boolean, DateTime, ForeignKey
+from sqlalchemy import create_engine, Column, String, Integer, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.dialects.sqlite import BLOB
 
@@ -27,9 +27,13 @@ class FileUpload(Base):
     file_token = Column(Integer, nullable=False)
     file_type = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
+    file_hash = Column(String, nullable=True, index=True)
 
     user = relationship("User", back_populates="file_uploads")
 
+    # A user never has two files with the same content, even when identical uploads race.
+    __table_args__ = (Index("ux_file_uploads_user_id_file_hash", "user_id", "file_hash", unique=True),)
+
 class Conversation(Base):
     __tablename__ = 'conversations'
     id = Column(String, primary_key=True, default=generate_uuid)
@@ -48,8 +52,53 @@ class Chat(Base):
 
     conversation = relationship("Conversation", back_populates="chats")
 
+class ConversationMemory(Base):
+    __tablename__ = 'conversation_memory'
+    conversation_id = Column(String, ForeignKey('conversations.id'), primary_key=True)
+    summary = Column(String, nullable=False, default="")
+    summarized_until = Column(String, nullable=False, default="")
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class IndexingJob(Base):
+    __tablename__ = 'indexing_jobs'
+    id = Column(String, primary_key=True, default=generate_uuid)
+    user_id = Column(String, ForeignKey('users.id'))
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    file_ids = Column(String, nullable=False)
+    total_files = Column(Integer, nullable=False, default=0)
+    files_processed = Column(Integer, nullable=False, default=0)
+    chunks_embedded = Column(Integer, nullable=False, default=0)
+    chunks_upserted = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    worker = Column(String, nullable=True)  # id of the server process running the job
+
 # Create SQLite database
 engine = create_engine("sqlite:///database.db", echo=True)
 Base.metadata.create_all(engine)
 
+# Databases created before uploads were hashed lack the file_hash column.
+with engine.begin() as connection:
+    columns = [row[1] for row in connection.exec_driver_sql("PRAGMA table_info(file_uploads)")]
+    if "file_hash" not in columns:
+        connection.exec_driver_sql("ALTER TABLE file_uploads ADD COLUMN file_hash VARCHAR")
+        connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_file_uploads_file_hash ON file_uploads (file_hash)")
+    duplicates = connection.exec_driver_sql(
+        "SELECT COUNT(*) FROM (SELECT 1 FROM file_uploads WHERE file_hash IS NOT NULL "
+        "GROUP BY user_id, file_hash HAVING COUNT(*) > 1)"
+    ).scalar()
+    if duplicates:
+        print(f"Found {duplicates} duplicated (user_id, file_hash) pair(s); delete the extra files, then run this again "
+              f"to create the unique index that stops concurrent duplicate uploads.")
+    else:
+        connection.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_file_uploads_user_id_file_hash ON file_uploads (user_id, file_hash)"
+        )
+    # ... and databases created before jobs were claimed per process lack the worker column.
+    columns = [row[1] for row in connection.exec_driver_sql("PRAGMA table_info(indexing_jobs)")]
+    if "worker" not in columns:
+        connection.exec_driver_sql("ALTER TABLE indexing_jobs ADD COLUMN worker VARCHAR")
+
 print("Tables with UUID primary keys created successfully!")
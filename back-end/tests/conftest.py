@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Settings are read when `config` is first imported, so these must be set before any test module
+# imports the app: the suite runs offline and writes nothing into the working tree.
+_cache_dir = tempfile.mkdtemp(prefix="back-end-tests-")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+os.environ.setdefault("DENSE_EMBEDDER", "fake")
+os.environ.setdefault("CHUNK_STORE_DIR", os.path.join(_cache_dir, "chunks"))
+os.environ.setdefault("INDEXING_WORKER_LOCK_DIR", os.path.join(_cache_dir, "workers"))
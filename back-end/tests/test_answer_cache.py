@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import answer_cache as answer_cache_module
+from utils.answer_cache import SemanticAnswerCache
+
+USER = "user"
+QUERY = [1.0, 0.0, 0.0]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(answer_cache_module, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def make_cache(**kwargs):
+    options = {"threshold": 0.9, "max_entries_per_user": 10, "ttl": 60.0}
+    options.update(kwargs)
+    return SemanticAnswerCache(**options)
+
+
+def test_similar_query_reuses_the_answer(clock):
+    cache = make_cache()
+    cache.store(USER, 1, QUERY, "what is x?", ["c1", 2], "x is y")
+    hit = cache.lookup(USER, 1, [0.99, 0.1, 0.0])
+    assert (hit.query, hit.chunk_ids, hit.answer) == ("what is x?", ["c1", "2"], "x is y")
+    assert hit.similarity == pytest.approx(0.995, abs=1e-3)
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_query_below_the_threshold_misses(clock):
+    cache = make_cache()
+    cache.store(USER, 1, QUERY, "what is x?", [], "x is y")
+    assert cache.lookup(USER, 1, [0.8, 0.6, 0.0]) is None  # cosine similarity 0.8
+    assert cache.lookup(USER, 1, [0.95, 0.312, 0.0]) is not None  # cosine similarity 0.95
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_a_new_collection_version_invalidates_older_answers(clock):
+    cache = make_cache()
+    cache.store(USER, 1, QUERY, "what is x?", [], "x is y")
+    assert cache.lookup(USER, 2, QUERY) is None
+    # Going back to the old version does not bring them back either.
+    assert cache.lookup(USER, 1, QUERY) is None
+
+
+def test_invalidate_drops_only_that_user(clock):
+    cache = make_cache()
+    cache.store(USER, 1, QUERY, "what is x?", [], "x is y")
+    cache.store("other", 1, QUERY, "what is x?", [], "x is z")
+    cache.invalidate(USER)
+    assert cache.lookup(USER, 1, QUERY) is None
+    assert cache.lookup("other", 1, QUERY).answer == "x is z"
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = make_cache(ttl=60.0)
+    cache.store(USER, 1, QUERY, "what is x?", [], "x is y")
+    clock.now += 60.0
+    assert cache.lookup(USER, 1, QUERY) is not None
+    clock.now += 0.1
+    assert cache.lookup(USER, 1, QUERY) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_each_user_keeps_the_most_recently_used_entries(clock):
+    cache = make_cache(max_entries_per_user=2)
+    vectors = {"a": [1.0, 0.0, 0.0], "b": [0.0, 1.0, 0.0], "c": [0.0, 0.0, 1.0]}
+    cache.store(USER, 1, vectors["a"], "a", [], "answer a")
+    cache.store(USER, 1, vectors["b"], "b", [], "answer b")
+    assert cache.lookup(USER, 1, vectors["a"]).answer == "answer a"  # "a" is now the most recent
+    cache.store(USER, 1, vectors["c"], "c", [], "answer c")
+
+    assert cache.lookup(USER, 1, vectors["b"]) is None
+    assert cache.lookup(USER, 1, vectors["a"]).answer == "answer a"
+    assert cache.lookup(USER, 1, vectors["c"]).answer == "answer c"
+    # The bound is per user.
+    cache.store("other", 1, vectors["a"], "a", [], "other a")
+    assert cache.stats()["entries"] == 3
+
+
+def test_missing_embeddings_or_answers_are_not_cached(clock):
+    cache = make_cache()
+    cache.store(USER, 1, None, "what is x?", [], "x is y")
+    cache.store(USER, 1, QUERY, "what is x?", [], "")
+    assert cache.lookup(USER, 1, QUERY) is None
+    assert cache.lookup(USER, 1, None) is None
@@ -0,0 +1,22 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.chunk_store import ChunkStore
+
+SHA = "ab" + "0" * 62
+
+
+def test_concurrent_saves_of_one_hash_do_not_collide(tmp_path):
+    store = ChunkStore(str(tmp_path))
+
+    def save(i):
+        entry = store.new_entry(SHA, f"text {i} " * 2000, 4000)
+        store.add_chunks(entry, "simple:500:50", [(0, 10), (5, 20)])
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(save, range(32)))
+
+    entry = store.load(SHA)
+    assert entry["sha256"] == SHA
+    assert entry["chunks"] == {"simple:500:50": [[0, 10], [5, 20]]}
+    assert os.listdir(tmp_path / SHA[:2]) == [f"{SHA}.json.gz"]
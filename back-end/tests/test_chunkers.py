@@ -0,0 +1,125 @@
+import pytest
+
+from utils import tokens
+from utils.chunkers import Chunker, SimpleChunker, StructureChunker, TokenChunker
+from utils.text_extraction import PAGE_BREAK
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # Every word and punctuation mark is one token, whatever tokenizer is installed.
+    monkeypatch.setattr(tokens, "get_tokenizer", lambda: None)
+
+
+def words(count: int, prefix: str = "w") -> str:
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def assert_valid_spans(text, spans):
+    assert spans == sorted(spans)
+    for start, end in spans:
+        assert 0 <= start < end <= len(text)
+        assert not text[start].isspace() and not text[end - 1].isspace()
+
+
+def test_chunker_split_is_abstract():
+    class Incomplete(Chunker):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize("chunker", [SimpleChunker(50, 10), TokenChunker(8, 2), StructureChunker(8, 2)])
+@pytest.mark.parametrize("text", ["", "  \n\n  "])
+def test_empty_text_has_no_chunks(chunker, text):
+    assert chunker.split(text) == []
+
+
+def test_simple_chunker_keeps_short_text_whole():
+    text = "  a short paragraph.\n"
+    assert SimpleChunker(50, 10).split(text) == [(2, len(text) - 1)]
+
+
+def test_simple_chunker_ends_on_word_breaks_and_overlaps_on_word_starts():
+    text = words(60)
+    spans = SimpleChunker(40, 10).split(text)
+    assert_valid_spans(text, spans)
+    assert len(spans) > 1
+    assert spans[-1][1] == len(text)
+    for (start, end), (next_start, _) in zip(spans, spans[1:]):
+        assert end - start <= 40
+        assert end == len(text) or text[end] == " "
+        assert start < next_start < end
+        assert text[next_start - 1] == " "
+
+
+def test_simple_chunker_without_overlap_covers_every_word_once():
+    text = words(60)
+    spans = SimpleChunker(40, 0).split(text)
+    assert_valid_spans(text, spans)
+    assert " ".join(text[start:end] for start, end in spans) == text
+
+
+def test_simple_chunker_prefers_paragraph_breaks():
+    text = words(6, "a") + "\n\n" + words(6, "b")
+    spans = SimpleChunker(30, 0).split(text)
+    assert [text[start:end] for start, end in spans] == [words(6, "a"), words(6, "b")]
+
+
+def test_token_chunker_windows_overlap_by_tokens():
+    text = words(20)
+    spans = TokenChunker(8, 2).split(text)
+    assert [text[start:end].split() for start, end in spans] == [
+        [f"w{i}" for i in range(0, 8)],
+        [f"w{i}" for i in range(6, 14)],
+        [f"w{i}" for i in range(12, 20)],
+    ]
+
+
+def test_token_chunker_folds_a_short_tail_into_the_last_chunk():
+    text = words(17)
+    spans = TokenChunker(8, 0).split(text)
+    assert [text[start:end].split() for start, end in spans] == [
+        [f"w{i}" for i in range(0, 8)],
+        [f"w{i}" for i in range(8, 17)],
+    ]
+
+
+def test_token_chunker_keeps_a_quarter_chunk_tail_separate():
+    text = words(18)
+    spans = TokenChunker(8, 0).split(text)
+    assert [len(text[start:end].split()) for start, end in spans] == [8, 8, 2]
+
+
+def test_structure_chunker_packs_sections_that_fit():
+    text = "# Intro\nalpha beta gamma\n# Scope\ndelta epsilon\n"
+    spans = StructureChunker(10, 2).split(text)
+    assert spans == [(0, text.index("epsilon") + len("epsilon"))]
+
+
+def test_structure_chunker_starts_a_chunk_at_the_heading_that_does_not_fit():
+    text = "# Intro\nalpha beta gamma\n# Scope\ndelta epsilon\n"
+    spans = StructureChunker(6, 2).split(text)
+    assert [text[start:end] for start, end in spans] == ["# Intro\nalpha beta gamma", "# Scope\ndelta epsilon"]
+
+
+def test_structure_chunker_starts_sections_at_page_breaks():
+    text = f"first page words\n{PAGE_BREAK}second page words"
+    assert [text[start:end] for start, end in StructureChunker(4, 0).split(text)] == [
+        "first page words", "second page words"
+    ]
+    assert StructureChunker(10, 0).split(text) == [(0, len(text))]
+
+
+def test_structure_chunker_splits_oversized_sections_by_tokens():
+    intro = "# Intro\nalpha beta gamma"
+    results = "# Results\n" + words(30, "r")
+    text = f"{intro}\n{results}\n"
+    spans = StructureChunker(10, 2).split(text)
+    assert_valid_spans(text, spans)
+    assert spans[0] == (0, len(intro))
+    results_start = text.index(results)
+    assert spans[1][0] == results_start
+    assert spans[-1][1] == results_start + len(results)
+    assert [len(tokens.token_spans(text[start:end])) for start, end in spans[1:]] == [10, 10, 10, 8]
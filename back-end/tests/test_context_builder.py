@@ -0,0 +1,102 @@
+import re
+from collections import namedtuple
+
+import pytest
+
+from utils import tokens
+from utils.context_builder import build_context, merge_sections
+
+Result = namedtuple("Result", "id score payload")
+
+DOCUMENT = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu"
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(tokens, "get_tokenizer", lambda: None)
+
+
+def chunk(chunk_id, start, end, chunk_index=None, score=0.5, file_id="file", text=None):
+    return Result(chunk_id, score, {
+        "file_id": file_id,
+        "start_offset": start,
+        "end_offset": end,
+        "chunk_index": chunk_index,
+        "text": DOCUMENT[start:end] if text is None else text,
+    })
+
+
+def span(word_from: str, word_to: str):
+    """Offsets in DOCUMENT from the start of `word_from` to the end of `word_to`."""
+    return re.search(rf"\b{word_from}\b", DOCUMENT).start(), re.search(rf"\b{word_to}\b", DOCUMENT).end()
+
+
+def test_overlapping_chunks_merge_without_repeating_the_overlap():
+    first, second = span("alpha", "epsilon"), span("delta", "eta")
+    sections = merge_sections([chunk("b", *second, 1, score=0.9), chunk("a", *first, 0, score=0.4)])
+    assert len(sections) == 1
+    assert sections[0].text == DOCUMENT[first[0]:second[1]]
+    assert (sections[0].start, sections[0].end) == (first[0], second[1])
+    assert sections[0].chunk_ids == ["a", "b"]
+    assert sections[0].score == 0.9
+
+
+def test_chunks_that_touch_merge_exactly():
+    first, second = (0, 11), (11, 17)
+    sections = merge_sections([chunk("a", *first, 0), chunk("b", *second, 1)])
+    assert [section.text for section in sections] == [DOCUMENT[0:17]]
+
+
+def test_neighbouring_chunks_with_a_gap_are_joined_by_a_space():
+    first, second = span("alpha", "beta"), span("gamma", "delta")
+    sections = merge_sections([chunk("a", *first, 0), chunk("b", *second, 1)])
+    assert [section.text for section in sections] == ["alpha beta gamma delta"]
+
+
+def test_distant_chunks_stay_separate():
+    first, second = span("alpha", "beta"), span("kappa", "mu")
+    sections = merge_sections([chunk("a", *first, 0), chunk("b", *second, 5)])
+    assert [section.text for section in sections] == ["alpha beta", "kappa lambda mu"]
+
+
+def test_fully_contained_chunk_adds_no_text():
+    outer, inner = span("alpha", "zeta"), span("gamma", "delta")
+    sections = merge_sections([chunk("a", *outer, 0), chunk("b", *inner, 1)])
+    assert [section.text for section in sections] == [DOCUMENT[outer[0]:outer[1]]]
+    assert sections[0].end == outer[1]
+    assert sections[0].chunk_ids == ["a", "b"]
+
+
+def test_chunks_of_other_files_or_without_offsets_are_not_merged():
+    first, second = span("alpha", "epsilon"), span("delta", "eta")
+    results = [
+        chunk("a", *first, 0),
+        chunk("b", *second, 1, file_id="other"),
+        Result("c", 0.5, {"file_id": "file", "text": "legacy chunk"}),
+    ]
+    sections = merge_sections(results)
+    assert sorted(section.chunk_ids[0] for section in sections) == ["a", "b", "c"]
+    assert all(len(section.chunk_ids) == 1 for section in sections)
+
+
+def test_sections_contained_in_a_better_one_are_dropped():
+    results = [
+        chunk("a", *span("alpha", "theta"), score=0.9),
+        chunk("b", 0, 0, score=0.5, file_id="copy", text="gamma delta epsilon zeta"),
+        chunk("c", 0, 0, score=0.4, file_id="other", text="something else entirely here"),
+    ]
+    context = build_context(results, token_budget=100, duplicate_threshold=0.8)
+    assert context.chunk_ids == ["a", "c"]
+    assert context.dropped_duplicates == 1
+
+
+def test_sections_are_packed_by_score_within_the_budget():
+    results = [
+        chunk("big", 0, 0, score=0.5, file_id="1", text="one two three four five six"),
+        chunk("best", 0, 0, score=0.9, file_id="2", text="seven eight nine"),
+        chunk("small", 0, 0, score=0.1, file_id="3", text="ten eleven"),
+    ]
+    context = build_context(results, token_budget=6, duplicate_threshold=0.8)
+    assert context.chunk_ids == ["best", "small"]
+    assert context.dropped_over_budget == 1
+    assert context.text == "seven eight nine\n\nten eleven"
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from utils import data_indexing_pipeline as pipeline
+from utils.chunk_store import ChunkStore
+from utils.chunkers import SimpleChunker
+from utils.text_extraction import ExtractedText
+
+USER_ID = "user"
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "chunk_store", ChunkStore(str(tmp_path / "chunks")))
+    monkeypatch.setattr(pipeline.FileCrud, "update_file_token", staticmethod(lambda file_id, file_token: True))
+    extracted_paths = []
+
+    def fake_extract_texts(file_paths):
+        for file_path in file_paths:
+            extracted_paths.append(file_path)
+            with open(file_path) as file:
+                yield ExtractedText(file.read(), True)
+
+    monkeypatch.setattr(pipeline, "extract_texts", fake_extract_texts)
+    os.makedirs(tmp_path / "data" / USER_ID)
+    return tmp_path / "data" / USER_ID, extracted_paths
+
+
+def write_files(folder, contents: dict) -> list:
+    for file_name, text in contents.items():
+        (folder / file_name).write_text(text)
+    return [(f"id-{file_name}", str(folder / file_name)) for file_name in contents]
+
+
+def texts_by_file(chunks) -> dict:
+    texts = {}
+    for chunk in chunks:
+        texts.setdefault(chunk["metadata"]["file_id"], []).append(chunk["text"])
+    return {file_id: " ".join(parts) for file_id, parts in texts.items()}
+
+
+def test_identical_files_do_not_shift_later_files(upload_dir):
+    folder, extracted_paths = upload_dir
+    files = write_files(folder, {
+        "a.txt": "alpha text of the first file",
+        "a-copy.txt": "alpha text of the first file",
+        "b.txt": "beta text of a different file",
+    })
+
+    chunks = list(pipeline.iter_files_chunks(USER_ID, files, SimpleChunker(100, 10)))
+
+    assert texts_by_file(chunks) == {
+        "id-a.txt": "alpha text of the first file",
+        "id-a-copy.txt": "alpha text of the first file",
+        "id-b.txt": "beta text of a different file",
+    }
+    # Each distinct content is extracted once.
+    assert [os.path.basename(path) for path in extracted_paths] == ["a.txt", "b.txt"]
+
+
+def test_entry_stored_by_another_job_does_not_shift_later_files(upload_dir):
+    folder, _ = upload_dir
+    files = write_files(folder, {"a.txt": "alpha text", "b.txt": "beta text", "c.txt": "gamma text"})
+    chunker = SimpleChunker(100, 10)
+    chunks = pipeline.iter_files_chunks(USER_ID, files, chunker)
+    first = next(chunks)
+
+    # Another job stores b.txt after this one decided to extract it.
+    store = pipeline.chunk_store
+    sha = pipeline.file_sha256(folder / "b.txt")
+    entry = store.new_entry(sha, "beta text", 2)
+    store.add_chunks(entry, chunker.key, chunker.split("beta text"))
+
+    assert texts_by_file([first, *chunks]) == {
+        "id-a.txt": "alpha text",
+        "id-b.txt": "beta text",
+        "id-c.txt": "gamma text",
+    }
+
+
+def test_stored_files_are_not_extracted_again(upload_dir):
+    folder, extracted_paths = upload_dir
+    files = write_files(folder, {"a.txt": "alpha text", "b.txt": "beta text"})
+    list(pipeline.iter_files_chunks(USER_ID, files, SimpleChunker(100, 10)))
+    extracted_paths.clear()
+
+    chunks = list(pipeline.iter_files_chunks(USER_ID, files, SimpleChunker(100, 10)))
+
+    assert extracted_paths == []
+    assert texts_by_file(chunks) == {"id-a.txt": "alpha text", "id-b.txt": "beta text"}
+
+
+class RecordingClient:
+    def __init__(self):
+        self.points = []
+
+    def upsert(self, collection_name, wait, points):
+        self.points.extend(points)
+
+
+def test_chunks_that_cannot_be_embedded_fail_the_indexing(monkeypatch):
+    monkeypatch.setattr(pipeline, "embed_chunk_batch", lambda batch: [chunk["id"] for chunk in batch[1:]])
+    client = RecordingClient()
+    chunks = [{"id": i, "text": f"chunk {i}", "metadata": {}} for i in range(5)]
+
+    with pytest.raises(pipeline.EmbeddingError, match="2 chunks"):
+        pipeline.index_chunks(client, "collection", chunks, batch_size=3)
+    assert client.points == [1, 2, 4]
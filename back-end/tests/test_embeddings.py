@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from config import settings
+from utils.embeddings import BatchEmbedder, FakeEmbedder
+
+
+class ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FlakyEmbedder(FakeEmbedder):
+    """Fails its first `failures` calls with the given error."""
+
+    def __init__(self, failures: int, error: Exception):
+        super().__init__(dimension=8)
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def embed(self, texts, task_type="RETRIEVAL_DOCUMENT"):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return super().embed(texts, task_type)
+
+    async def embed_async(self, texts, task_type="RETRIEVAL_DOCUMENT"):
+        return self.embed(texts, task_type)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_RETRIES", 2)
+    monkeypatch.setattr(settings, "EMBEDDING_RETRY_BACKOFF", 0)
+
+
+@pytest.mark.parametrize("error", [ApiError(429), ApiError(503), TimeoutError("timed out")])
+def test_transient_failures_are_retried(error):
+    embedder = FlakyEmbedder(failures=2, error=error)
+    embeddings = BatchEmbedder(embedder).embed(["alpha", "beta"])
+    assert embedder.calls == 3
+    assert all(embeddings)
+
+
+def test_batch_gets_none_once_retries_run_out():
+    embedder = FlakyEmbedder(failures=3, error=ApiError(429))
+    assert BatchEmbedder(embedder).embed(["alpha", "beta"]) == [None, None]
+    assert embedder.calls == 3
+
+
+def test_permanent_failures_are_not_retried():
+    embedder = FlakyEmbedder(failures=1, error=ApiError(400))
+    assert BatchEmbedder(embedder).embed(["alpha"]) == [None]
+    assert embedder.calls == 1
+
+
+def test_async_embedding_retries_too():
+    embedder = FlakyEmbedder(failures=1, error=ApiError(429))
+    embeddings = asyncio.run(BatchEmbedder(embedder).embed_async(["alpha"]))
+    assert embedder.calls == 2
+    assert all(embeddings)
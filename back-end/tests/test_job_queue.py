@@ -0,0 +1,73 @@
+import threading
+import time
+
+from utils.job_queue import UserSerializedQueue
+
+TIMEOUT = 5
+
+
+def test_jobs_of_one_user_run_one_at_a_time_in_order():
+    queue = UserSerializedQueue(max_workers=4)
+    order, running, overlaps = [], [], []
+    done = threading.Event()
+
+    def task(i):
+        running.append(i)
+        if len(running) > 1:
+            overlaps.append(list(running))
+        time.sleep(0.001)
+        order.append(i)
+        running.remove(i)
+        if i == 19:
+            done.set()
+
+    for i in range(20):
+        queue.submit("user", lambda i=i: task(i))
+    assert done.wait(TIMEOUT)
+    queue.shutdown()
+    assert order == list(range(20))
+    assert overlaps == []
+
+
+def test_at_most_max_workers_jobs_run_at_once():
+    queue = UserSerializedQueue(max_workers=2)
+    lock = threading.Lock()
+    gate = threading.Event()
+    state = {"running": 0, "peak": 0, "finished": 0}
+    all_finished = threading.Event()
+
+    def task():
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        gate.wait(TIMEOUT)
+        with lock:
+            state["running"] -= 1
+            state["finished"] += 1
+            if state["finished"] == 4:
+                all_finished.set()
+
+    for user_id in ("a", "b", "c", "d"):
+        queue.submit(user_id, task)
+    deadline = time.monotonic() + TIMEOUT
+    while state["running"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert state["running"] == 2
+    gate.set()
+    assert all_finished.wait(TIMEOUT)
+    queue.shutdown()
+    assert state["peak"] == 2
+
+
+def test_a_failing_job_does_not_stop_the_users_next_jobs():
+    queue = UserSerializedQueue(max_workers=1)
+    done = threading.Event()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    queue.submit("user", fail)
+    queue.submit("user", done.set)
+    assert done.wait(TIMEOUT)
+    queue.shutdown()
@@ -0,0 +1,100 @@
+import pytest
+
+from core import database
+from crud.jobs import JobCrud
+from services import jobs as jobs_service
+from services.jobs import IndexingJobService
+
+USER_ID = "user"
+
+
+class FakeWorkerLock:
+    def __init__(self, worker_id, alive=()):
+        self.worker_id = worker_id
+        self.alive = set(alive)
+
+    def acquire(self):
+        return self.worker_id
+
+    def is_alive(self, worker_id):
+        return worker_id == self.worker_id or worker_id in self.alive
+
+
+class RecordingQueue:
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, user_id, task):
+        self.tasks.append(task)
+
+    def run_all(self):
+        tasks, self.tasks = self.tasks, []
+        for task in tasks:
+            task()
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    pool = database.ConnectionPool(str(tmp_path / "jobs.db"))
+    pool.connection().execute(
+        "CREATE TABLE indexing_jobs (id VARCHAR PRIMARY KEY, user_id VARCHAR, kind VARCHAR NOT NULL, "
+        "status VARCHAR NOT NULL, file_ids VARCHAR NOT NULL, total_files INTEGER NOT NULL, "
+        "files_processed INTEGER NOT NULL, chunks_embedded INTEGER NOT NULL, chunks_upserted INTEGER NOT NULL, "
+        "error VARCHAR, created_at DATETIME, updated_at DATETIME, worker VARCHAR)"
+    )
+    monkeypatch.setattr(database, "pool", pool)
+    monkeypatch.setattr(jobs_service, "indexing_queue", RecordingQueue())
+    monkeypatch.setattr(jobs_service, "worker_lock", FakeWorkerLock("this"))
+    removed = []
+    monkeypatch.setattr(jobs_service, "remove_data_from_vector_store",
+                        lambda user_id, file_id: removed.append(file_id) or True)
+    service = IndexingJobService()
+    service.removed = removed
+    yield service
+    pool.close_all()
+
+
+def status(service, job_id):
+    job = JobCrud.get_job_by_id(service, job_id)
+    return job[3], job[12]
+
+
+def test_a_job_runs_only_in_the_worker_that_claims_it(service):
+    job_id = service.create_job(USER_ID, "remove", ["f1"])
+
+    service.run_job(job_id, USER_ID, "remove", ["f1"])
+    assert status(service, job_id) == ("completed", "this")
+
+    # Another server process picking up the same job finds it already claimed.
+    jobs_service.worker_lock = FakeWorkerLock("other")
+    service.run_job(job_id, USER_ID, "remove", ["f1"])
+    assert service.removed == ["f1"]
+
+
+def test_resume_requeues_queued_jobs_and_jobs_of_dead_workers_only(service):
+    queued = service.create_job(USER_ID, "remove", ["queued"])
+    orphaned = service.create_job(USER_ID, "remove", ["orphaned"])
+    live = service.create_job(USER_ID, "remove", ["live"])
+    assert JobCrud.claim_job(service, orphaned, "dead")
+    assert JobCrud.claim_job(service, live, "alive")
+    jobs_service.worker_lock = FakeWorkerLock("this", alive={"alive"})
+
+    assert service.resume_unfinished_jobs() == 2
+    assert status(service, orphaned) == ("queued", None)
+    assert status(service, live) == ("running", "alive")
+
+    jobs_service.indexing_queue.run_all()
+    assert sorted(service.removed) == ["orphaned", "queued"]
+    assert status(service, orphaned) == ("completed", "this")
+
+
+def test_requeueing_fails_once_the_job_changed_hands(service):
+    job_id = service.create_job(USER_ID, "remove", ["f1"])
+    assert JobCrud.claim_job(service, job_id, "dead")
+    # Another process requeued and re-claimed it first.
+    assert JobCrud.requeue_orphaned_job(service, job_id, "dead")
+    assert JobCrud.claim_job(service, job_id, "other")
+
+    assert not JobCrud.requeue_orphaned_job(service, job_id, "dead")
+    assert not JobCrud.claim_job(service, job_id, "this")
+    assert status(service, job_id) == ("running", "other")
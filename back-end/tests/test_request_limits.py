@@ -0,0 +1,51 @@
+import asyncio
+
+from utils.request_limits import BodySizeLimitMiddleware
+
+PATH = "/upload"
+
+
+async def read_body_app(scope, receive, send):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+def call(body_parts, path=PATH, content_length=None, max_bytes=10):
+    messages = [{"type": "http.request", "body": part, "more_body": i < len(body_parts) - 1}
+                for i, part in enumerate(body_parts)]
+    read = []
+    sent = []
+
+    async def receive():
+        read.append(messages[len(read)])
+        return read[-1]
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [] if content_length is None else [(b"content-length", str(content_length).encode())]
+    scope = {"type": "http", "path": path, "headers": headers}
+    asyncio.run(BodySizeLimitMiddleware(read_body_app, {PATH: max_bytes})(scope, receive, send))
+    return sent[0]["status"], len(read)
+
+
+def test_body_within_the_limit_passes():
+    assert call([b"12345", b"67890"]) == (200, 2)
+
+
+def test_body_is_cut_off_once_it_crosses_the_limit():
+    assert call([b"12345", b"67890", b"x", b"never read"]) == (413, 3)
+
+
+def test_announced_content_length_is_refused_before_reading():
+    assert call([b"x" * 20], content_length=20) == (413, 0)
+
+
+def test_other_paths_are_not_limited():
+    assert call([b"x" * 20], path="/other") == (200, 1)
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+from config import settings
+
+
+class CachedAnswer:
+    def __init__(self, query: str, chunk_ids: List[str], answer: str, similarity: float):
+        self.query = query
+        self.chunk_ids = chunk_ids
+        self.answer = answer
+        self.similarity = similarity
+
+
+class SemanticAnswerCache:
+    """Per-user cache of generated answers, looked up by query-embedding similarity.
+
+    Every entry remembers the collection version it was generated against. A lookup only
+    matches entries of the current version, so answers are never served once a file has been
+    added to or removed from the user's collection. Entries expire after `ttl` seconds and each
+    user keeps at most `max_entries_per_user`, evicting the least recently used.
+    """
+
+    def __init__(self, threshold: float = settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+                 max_entries_per_user: int = settings.ANSWER_CACHE_MAX_ENTRIES_PER_USER,
+                 ttl: float = settings.ANSWER_CACHE_TTL_SECONDS):
+        self.threshold = threshold
+        self.max_entries_per_user = max_entries_per_user
+        self.ttl = ttl
+        self._users = {}  # user_id -> {"version": ..., "entries": OrderedDict}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _user_entries(self, user_id: str, version) -> OrderedDict:
+        user = self._users.get(user_id)
+        if user is None or user["version"] != version:
+            # The collection changed (or this user is new): everything cached before is stale.
+            user = {"version": version, "entries": OrderedDict()}
+            self._users[user_id] = user
+        return user["entries"]
+
+    def lookup(self, user_id: str, version, embedding) -> Optional[CachedAnswer]:
+        """Returns the most similar cached answer above the threshold, if any."""
+        if embedding is None:
+            return None
+        query_vector = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            entries = self._user_entries(user_id, version)
+            for key in [key for key, entry in entries.items() if now - entry["created"] > self.ttl]:
+                del entries[key]
+            if not entries:
+                self.misses += 1
+                return None
+            keys = list(entries)
+            matrix = np.stack([entries[key]["vector"] for key in keys])
+            similarities = matrix @ query_vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            entries.move_to_end(keys[best])
+            entry = entries[keys[best]]
+            self.hits += 1
+            return CachedAnswer(entry["query"], entry["chunk_ids"], entry["answer"], float(similarities[best]))
+
+    def store(self, user_id: str, version, embedding, query: str, chunk_ids: List[str], answer: str) -> None:
+        if embedding is None or not answer:
+            return
+        with self._lock:
+            entries = self._user_entries(user_id, version)
+            entries[query] = {
+                "vector": self._normalize(embedding),
+                "query": query,
+                "chunk_ids": [str(chunk_id) for chunk_id in chunk_ids],
+                "answer": answer,
+                "created": time.time(),
+            }
+            entries.move_to_end(query)
+            while len(entries) > self.max_entries_per_user:
+                entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drops every cached answer of a user, e.g. when their files change."""
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = sum(len(user["entries"]) for user in self._users.values())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,88 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Iterator, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(file_path, block_size: int = 1024 * 1024) -> str:
+    """Returns the SHA-256 hex digest of a file, reading it in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ChunkStore:
+    """On-disk store of extracted text and chunk boundaries, keyed by file SHA-256.
+
+    Each file is one gzip-compressed JSON document holding the extracted text, its token count
+    and, per chunker configuration, the chunk boundaries as (start, end) character offsets into
+    the text. Chunk ordinals are the positions in that list. Unchanged files never need to be
+    parsed again, and chunks can be re-read for indexing or citation display.
+    """
+
+    def __init__(self, root: str = settings.CHUNK_STORE_DIR):
+        self.root = root
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], f"{sha256}.json.gz")
+
+    def contains(self, sha256: str) -> bool:
+        return os.path.exists(self._path(sha256))
+
+    def load(self, sha256: str) -> Optional[dict]:
+        """Returns the stored document for a file hash, or None if it has not been stored."""
+        path = self._path(sha256)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                return json.load(file)
+        except Exception as e:
+            logger.error(f"Error reading chunk store entry {sha256}: {e}")
+            return None
+
+    def new_entry(self, sha256: str, text: str, token_count: int) -> dict:
+        return {"sha256": sha256, "text": text, "token_count": token_count, "chunks": {}}
+
+    def save(self, entry: dict) -> None:
+        """Writes an entry atomically, replacing any previous version.
+
+        Every call writes its own temporary file, so jobs saving the same file hash at once
+        (in threads or processes) never write into each other's copy; the last replace wins.
+        """
+        path = self._path(entry["sha256"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{entry['sha256']}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as file:
+                json.dump(entry, file, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def add_chunks(self, entry: dict, chunker_key: str, boundaries: List[tuple], persist: bool = True) -> None:
+        """Records the chunk boundaries of one chunker configuration and, unless `persist` is
+        False, saves the entry."""
+        entry["chunks"][chunker_key] = [[start, end] for start, end in boundaries]
+        if persist:
+            self.save(entry)
+
+    def iter_chunks(self, entry: dict, chunker_key: str) -> Iterator[dict]:
+        """Yields the stored chunks of an entry as dicts with ordinal, start, end and text."""
+        text = entry["text"]
+        for ordinal, (start, end) in enumerate(entry["chunks"].get(chunker_key, [])):
+            yield {"ordinal": ordinal, "start": start, "end": end, "text": text[start:end]}
+
+
+chunk_store = ChunkStore()
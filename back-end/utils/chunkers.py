@@ -0,0 +1,205 @@
+import abc
+import re
+from typing import List, Optional, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from config import settings
+from utils.text_extraction import PAGE_BREAK
+from utils.tokens import count_tokens, token_spans
+
+_HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:"
+    r"#{1,6}[ \t]+\S[^\n]*"  # markdown heading
+    r"|(?:\d+(?:\.\d+)*\.?|[IVX]+\.)[ \t]+[A-Z][^\n]{0,80}"  # numbered heading: "2.1 Scope", "IV. Results"
+    r"|[A-Z][A-Z0-9 ,:&()'-]{3,80}"  # ALL CAPS line
+    r")[ \t]*$",
+    re.MULTILINE
+)
+
+
+def _trim(text: str, start: int, end: int) -> Optional[Tuple[int, int]]:
+    """Narrows [start, end) to exclude surrounding whitespace; None if nothing is left."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
+
+class Chunker(abc.ABC):
+    """Splits text into chunks, returned as (start, end) character offsets into the text.
+
+    `key` identifies the configuration. The chunk store keeps boundaries per key, so switching
+    chunkers or sizes re-chunks stored text without extracting the file again.
+    """
+
+    name = ""
+    default_size = 500
+    default_overlap = 50
+
+    def __init__(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None):
+        self.chunk_size = chunk_size or self.default_size
+        self.chunk_overlap = self.default_overlap if chunk_overlap is None else chunk_overlap
+        if not 0 <= self.chunk_overlap < self.chunk_size:
+            raise ValueError(f"Chunk overlap must be smaller than the chunk size, got {self.chunk_overlap} >= {self.chunk_size}")
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.chunk_size}:{self.chunk_overlap}"
+
+    @abc.abstractmethod
+    def split(self, text: str) -> List[Tuple[int, int]]:
+        """(start, end) offsets of the chunks of `text`, in order and trimmed of surrounding whitespace."""
+
+
+class RecursiveChunker(Chunker):
+    """LangChain's recursive splitter, sized in characters."""
+
+    name = "recursive"
+
+    def __init__(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None):
+        super().__init__(chunk_size, chunk_overlap)
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            separators=["\n\n", "\n", " ", ""],
+            add_start_index=True
+        )
+
+    def split(self, text: str) -> List[Tuple[int, int]]:
+        boundaries = []
+        for document in self.splitter.create_documents([text]):
+            start = document.metadata["start_index"]
+            boundaries.append((start, start + len(document.page_content)))
+        return boundaries
+
+
+class SimpleChunker(Chunker):
+    """Single-pass character windows that end on a paragraph, line or word break when one is
+    in the second half of the window. Sized in characters; no dependencies."""
+
+    name = "simple"
+
+    def split(self, text: str) -> List[Tuple[int, int]]:
+        boundaries = []
+        length = len(text)
+        start = 0
+        while start < length:
+            end = min(start + self.chunk_size, length)
+            if end < length:
+                floor = start + self.chunk_size // 2
+                for separator in ("\n\n", "\n", " "):
+                    cut = text.rfind(separator, floor, end)
+                    if cut != -1:
+                        end = cut
+                        break
+            span = _trim(text, start, end)
+            if span:
+                boundaries.append(span)
+            if end >= length:
+                break
+            next_start = max(end - self.chunk_overlap, start + 1)
+            if self.chunk_overlap:
+                # Begin the overlap on a word boundary rather than mid-word.
+                space = text.find(" ", next_start, end)
+                if space != -1:
+                    next_start = space + 1
+            start = next_start
+        return boundaries
+
+
+class TokenChunker(Chunker):
+    """Windows of `chunk_size` tokens of the configured tokenizer (TOKENIZER_MODEL), so every
+    chunk has about the same embedding cost. A tail shorter than a quarter chunk joins the last chunk."""
+
+    name = "token"
+    default_size = 256
+    default_overlap = 32
+
+    def split(self, text: str) -> List[Tuple[int, int]]:
+        spans = token_spans(text)
+        boundaries = []
+        first = 0
+        while first < len(spans):
+            last = first + self.chunk_size
+            if len(spans) - last < self.chunk_size // 4:
+                last = len(spans)
+            boundaries.append((spans[first][0], spans[last - 1][1]))
+            if last >= len(spans):
+                break
+            first = last - self.chunk_overlap
+        return boundaries
+
+
+class StructureChunker(Chunker):
+    """Chunks that follow the document's layout: they start at PDF page breaks and headings.
+
+    Consecutive sections are packed into one chunk while they fit, so a chunk never cuts a
+    section in two; sections larger than a chunk are split with the token chunker. Sized in tokens.
+    """
+
+    name = "structure"
+    default_size = 256
+    default_overlap = 32
+
+    def __init__(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None):
+        super().__init__(chunk_size, chunk_overlap)
+        self.token_chunker = TokenChunker(self.chunk_size, self.chunk_overlap)
+
+    @staticmethod
+    def section_starts(text: str) -> List[int]:
+        starts = {0}
+        starts.update(match.start() for match in _HEADING_PATTERN.finditer(text))
+        starts.update(match.end() for match in re.finditer(PAGE_BREAK, text))
+        return sorted(start for start in starts if start < len(text))
+
+    def split(self, text: str) -> List[Tuple[int, int]]:
+        starts = self.section_starts(text)
+        boundaries = []
+        current = None  # (start, end, tokens) of the chunk being assembled
+        for start, end in zip(starts, starts[1:] + [len(text)]):
+            span = _trim(text, start, end)
+            if not span:
+                continue
+            start, end = span
+            tokens = count_tokens(text[start:end])
+            if tokens > self.chunk_size:
+                if current:
+                    boundaries.append(current[:2])
+                    current = None
+                boundaries.extend((start + a, start + b) for a, b in self.token_chunker.split(text[start:end]))
+                continue
+            if current and current[2] + tokens > self.chunk_size:
+                boundaries.append(current[:2])
+                current = None
+            current = (current[0], end, current[2] + tokens) if current else (start, end, tokens)
+        if current:
+            boundaries.append(current[:2])
+        return boundaries
+
+
+_chunkers = {
+    "recursive": RecursiveChunker,
+    "simple": SimpleChunker,
+    "token": TokenChunker,
+    "structure": StructureChunker,
+}
+
+
+def get_chunker(spec: str = settings.CHUNKER) -> Chunker:
+    """Builds a chunker from a spec of the form "name", "name:size" or "name:size:overlap"."""
+    name, *sizes = spec.split(":")
+    if name not in _chunkers:
+        raise ValueError(f"Unknown chunker '{name}'. Expected one of {list(_chunkers)}")
+    return _chunkers[name](*(int(size) for size in sizes))
+
+
+def get_collection_chunker(collection_name: str) -> Chunker:
+    """The chunker configured for a collection in COLLECTION_CHUNKERS, or the default CHUNKER.
+    In shared mode every user gets the shared collection's chunker."""
+    return get_chunker(settings.COLLECTION_CHUNKERS.get(collection_name, settings.CHUNKER))
+
+
+def register_chunker(name: str, factory) -> None:
+    """Registers an additional chunker so it can be selected by name in CHUNKER or COLLECTION_CHUNKERS."""
+    _chunkers[name] = factory
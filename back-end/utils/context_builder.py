@@ -0,0 +1,111 @@
+import re
+from typing import List
+
+from config import settings
+from utils.tokens import count_tokens
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class ContextSection:
+    """A contiguous span of one file, built from one or more retrieved chunks."""
+
+    def __init__(self, result):
+        payload = result.payload or {}
+        self.file_id = payload.get("file_id")
+        self.start = payload.get("start_offset")
+        self.end = payload.get("end_offset")
+        self.last_chunk_index = payload.get("chunk_index")
+        self.text = payload.get("text", "")
+        self.score = result.score or 0.0
+        self.chunk_ids = [str(result.id)]
+
+    def can_merge(self, other: "ContextSection") -> bool:
+        if self.file_id is None or self.file_id != other.file_id or None in (self.start, self.end, other.start):
+            return False
+        adjacent = self.last_chunk_index is not None and other.last_chunk_index == self.last_chunk_index + 1
+        return other.start <= self.end or adjacent
+
+    def merge(self, other: "ContextSection") -> None:
+        """Appends `other`, which starts at or after this section, without repeating the overlap."""
+        if other.end is not None and other.end <= self.end:
+            pass  # fully contained
+        elif other.start <= self.end:
+            self.text += other.text[self.end - other.start:]
+            self.end = other.end
+        else:
+            self.text += " " + other.text
+            self.end = other.end
+        self.last_chunk_index = max(self.last_chunk_index or 0, other.last_chunk_index or 0)
+        self.score = max(self.score, other.score)
+        self.chunk_ids.extend(other.chunk_ids)
+
+
+class PackedContext:
+    def __init__(self, sections: List[ContextSection], dropped_duplicates: int, dropped_over_budget: int):
+        self.sections = sections
+        self.text = "\n\n".join(section.text for section in sections)
+        self.tokens = count_tokens(self.text)
+        self.chunk_ids = [chunk_id for section in sections for chunk_id in section.chunk_ids]
+        self.dropped_duplicates = dropped_duplicates
+        self.dropped_over_budget = dropped_over_budget
+
+
+def merge_sections(results) -> List[ContextSection]:
+    """Stitches chunks of the same file that overlap or are neighbours into single sections."""
+    sections = [ContextSection(result) for result in results]
+    mergeable = sorted(
+        (section for section in sections if section.file_id is not None and section.start is not None),
+        key=lambda section: (section.file_id, section.start)
+    )
+    merged = [section for section in sections if section.file_id is None or section.start is None]
+    for section in mergeable:
+        if merged and merged[-1].can_merge(section):
+            merged[-1].merge(section)
+        else:
+            merged.append(section)
+    return merged
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _containment(candidate: set, kept: set) -> float:
+    """Share of `candidate`'s shingles already present in `kept`, so sub-spans of a kept section count as duplicates."""
+    if not candidate or not kept:
+        return 0.0
+    return len(candidate & kept) / len(candidate)
+
+
+def build_context(results, token_budget: int = settings.CONTEXT_TOKEN_BUDGET,
+                  duplicate_threshold: float = settings.CONTEXT_DUPLICATE_THRESHOLD) -> PackedContext:
+    """
+    Turns search results into the context of a prompt: overlapping and adjacent chunks of a file
+    are merged, sections whose word 3-grams are at least `duplicate_threshold` contained in a
+    better-scored section are dropped, and the rest are packed by score into `token_budget` tokens.
+    """
+    sections = sorted(merge_sections(results), key=lambda section: section.score, reverse=True)
+
+    kept, kept_shingles, dropped_duplicates = [], [], 0
+    for section in sections:
+        shingles = _shingles(section.text)
+        if any(_containment(shingles, other) >= duplicate_threshold for other in kept_shingles):
+            dropped_duplicates += 1
+            continue
+        kept.append(section)
+        kept_shingles.append(shingles)
+
+    packed, used, dropped_over_budget = [], 0, 0
+    for section in kept:
+        # Sections are separated by a blank line, which costs next to nothing; the budget covers their text.
+        tokens = count_tokens(section.text)
+        if used + tokens > token_budget:
+            dropped_over_budget += 1
+            continue
+        packed.append(section)
+        used += tokens
+    return PackedContext(packed, dropped_duplicates, dropped_over_budget)
@@ -0,0 +1,58 @@
+import json
+from typing import List
+
+from config import settings
+from utils.tokens import count_tokens
+
+
+def format_turn(content: str) -> str:
+    """Renders a stored chat row's JSON content as a "User: ... / Assistant: ..." exchange."""
+    try:
+        turn = json.loads(content)
+    except (TypeError, ValueError):
+        return str(content)
+    return f"User: {turn.get('HumanMessage', '')}\nAssistant: {turn.get('AIResponse', '')}"
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    # Keep the tail: the end of a turn is what the next question usually refers to.
+    keep = max(0, int(len(text) * max_tokens / tokens))
+    return "..." + text[len(text) - keep:] if keep else ""
+
+
+class ConversationMemory:
+    """A conversation's rolling summary plus its most recent turns, packed into a token budget.
+
+    Turns are added newest first until the budget (minus the summary) is spent, so the prompt
+    built from a memory stays the same size however long the conversation gets.
+    """
+
+    def __init__(self, summary: str, turns: List[str], token_budget: int = settings.CHAT_MEMORY_TOKEN_BUDGET):
+        self.summary = summary or ""
+        self.turn_count = len(turns)
+        remaining = token_budget - count_tokens(self.summary)
+        packed = []
+        for turn in reversed(turns):
+            tokens = count_tokens(turn)
+            if tokens > remaining:
+                if not packed and remaining > 0:
+                    packed.append(_truncate_to_tokens(turn, remaining))
+                break
+            packed.append(turn)
+            remaining -= tokens
+        self.turns = list(reversed(packed))
+        self.tokens = count_tokens(self.summary) + sum(count_tokens(turn) for turn in self.turns)
+
+    def __bool__(self) -> bool:
+        return bool(self.summary or self.turns)
+
+    def render(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+        if self.turns:
+            parts.append("Most recent turns:\n" + "\n\n".join(self.turns))
+        return "\n\n".join(parts)
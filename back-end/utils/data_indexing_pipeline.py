@@ -1,173 +1,309 @@
-import os
-import google.generativeai as genai
+import logging
+import queue
+import threading
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional
 from qdrant_client import QdrantClient, models
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from fastembed import SparseTextEmbedding
 import warnings
 from config import settings
-from PyPDF2 import PdfReader
-from bs4 import BeautifulSoup
 import uuid
+from collections import Counter
 from crud.upload import FileCrud
 from tqdm import tqdm
+from utils.embeddings import EmbeddingError, get_dense_embedder, SparseEmbedder
+from utils.embedding_cache import get_embedding_cache
+from utils.text_extraction import extract_texts
+from utils.chunk_store import chunk_store, file_sha256
+from utils.chunkers import Chunker, get_collection_chunker
+from utils.tokens import count_tokens
+from utils.vector_store import (
+    get_qdrant_client, call_with_retries, collection_config, collection_for_user, ensure_payload_indexes,
+    is_shared_collection, tenant_condition
+)
+from utils.metrics import INDEXING_STAGE_SECONDS, timed
 
 warnings.filterwarnings("ignore")
-genai.configure(api_key=settings.GEMINI_KEY)
 
+logger = logging.getLogger(__name__)
 
-# instead of QdrantClient(path=...)
-qdrant_client = QdrantClient(url="http://127.0.0.1:6333", prefer_grpc=False)
 
+dense_embedder = get_dense_embedder()
+sparse_embedder = SparseEmbedder(cache=get_embedding_cache())
+_provisioned_collections = set()
 
-sparse_embed_model = SparseTextEmbedding(model_name=settings.SPARSE_EMBEDDING_MODEL)
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=500,
-    chunk_overlap=50,
-    separators=["\n\n", "\n", " ", ""]
-)
-dense_vector_size = 768
+def create_qdrant_client(collection_name: str, recreate: bool = False):
+    """Returns the shared Qdrant client, creating the collection only if it is missing (or when `recreate` is set).
 
-def create_qdrant_client(collection_name: str):
-    """Creates a Qdrant client for the specified collection."""
+    New collections are provisioned from the QDRANT_* collection settings. Collections created
+    before the payload indexes existed get them the first time this process writes to them.
+    """
     try:
-        print(f"Creating Qdrant client for collection: {collection_name}")
-        qdrant_client.recreate_collection(
-            collection_name=collection_name,
-            vectors_config={
-                "dense_vectors": models.VectorParams(size=dense_vector_size, distance=models.Distance.COSINE)
-            },
-            sparse_vectors_config={
-                "sparse_vectors": models.SparseVectorParams(
-                    index=models.SparseIndexParams(on_disk=True)
-                )
-            }
-        )
+        qdrant_client = get_qdrant_client()
+        if recreate and call_with_retries(qdrant_client.collection_exists, collection_name):
+            logger.info("Dropping existing collection: %s", collection_name)
+            call_with_retries(qdrant_client.delete_collection, collection_name=collection_name)
+            _provisioned_collections.discard(collection_name)
+
+        if not call_with_retries(qdrant_client.collection_exists, collection_name):
+            logger.info("Creating Qdrant collection: %s", collection_name)
+            call_with_retries(qdrant_client.create_collection, collection_name=collection_name, **collection_config(collection_name))
+        if collection_name not in _provisioned_collections:
+            ensure_payload_indexes(qdrant_client, collection_name)
+            _provisioned_collections.add(collection_name)
         return qdrant_client
     except Exception as e:
-        print(f"Error adding data to vector store: {e}")
+        logger.error(f"Error adding data to vector store: {e}")
         return None
 
 
-def generate_gemini_embedding(text: str, model_name: str = settings.GEMINI_EMBEDDING_MODEL):
-    """Generates a dense embedding for the given text using the Gemini API."""
-    try:
-        response = genai.embed_content(
-            model=model_name,
-            content=text,
-            task_type="RETRIEVAL_DOCUMENT"
-        )
-        return response['embedding']
-    except Exception as e:
-        print(f"Error generating Gemini embedding: {e}")
-        return None
+def file_id_filter(file_id: str, user_id: Optional[str] = None) -> models.Filter:
+    """Payload filter matching every point that belongs to the given file (and user, when given)."""
+    return file_ids_filter([file_id], user_id)
+
+
+def file_ids_filter(file_ids: List[str], user_id: Optional[str] = None) -> models.Filter:
+    """Payload filter matching every point that belongs to any of the given files (and user, when given)."""
+    must = [models.FieldCondition(key="file_id", match=models.MatchAny(any=[str(file_id) for file_id in file_ids]))]
+    if user_id is not None:
+        must.append(tenant_condition(user_id))
+    return models.Filter(must=must)
+
+
+def iter_files_chunks(user_id: str, files: List[tuple], chunker: Chunker,
+                      progress: Optional[Callable[..., None]] = None) -> Iterator[dict]:
+    """Yields the chunks of uploaded files given as (file_id, file_path) pairs, tagged with their file_id.
+
+    Text and chunk boundaries come from the chunk store when the file's SHA-256 is known there;
+    only new files are extracted, in the process pool and ahead of the consumer, so the next
+    files are being parsed while the current file's chunks are embedded. The file's token count
+    is recorded on its file_uploads row. `progress` gets `files=1` per finished file.
+    """
+    file_paths = [file_path for _, file_path in files]
+    hashes = [file_sha256(file_path) for file_path in file_paths]
+    occurrences = Counter(hashes)
+    # Whether a file is extracted is decided here, once per distinct hash. Results are paired
+    # with their hash, so entries another job stores meanwhile cannot shift them onto other files.
+    to_extract = {}
+    for file_path, sha in zip(file_paths, hashes):
+        if sha not in to_extract and not chunk_store.contains(sha):
+            to_extract[sha] = file_path
+    extracted = zip(list(to_extract), extract_texts(list(to_extract.values())))
+    # Entries of hashes that appear more than once in this job, for the files after the first.
+    shared_entries = {}
+
+    for (file_id, _), file_path, sha in zip(files, file_paths, hashes):
+        complete = True
+        if sha in shared_entries:
+            entry, complete = shared_entries[sha]
+        elif sha in to_extract:
+            del to_extract[sha]
+            with timed(INDEXING_STAGE_SECONDS, "extraction"):
+                extracted_sha, (content, complete) = next(extracted)
+            assert extracted_sha == sha
+            entry = chunk_store.new_entry(sha, content, count_tokens(content))
+        else:
+            entry = chunk_store.load(sha)
+            if entry is None:
+                # The stored entry disappeared or is unreadable; extract this one file on the spot.
+                with timed(INDEXING_STAGE_SECONDS, "extraction"):
+                    content, complete = next(extract_texts([file_path]))
+                entry = chunk_store.new_entry(sha, content, count_tokens(content))
+        if chunker.key not in entry["chunks"] and entry["text"]:
+            with timed(INDEXING_STAGE_SECONDS, "chunking"):
+                boundaries = chunker.split(entry["text"])
+            # Text missing pages (timed-out or failed extraction) is indexed but not stored, so the file is parsed again next time.
+            chunk_store.add_chunks(entry, chunker.key, boundaries, persist=complete)
+        if occurrences[sha] > 1:
+            shared_entries[sha] = (entry, complete)
+        FileCrud.update_file_token(file_id, entry["token_count"])
+
+        chunk_count = 0
+        for chunk in chunk_store.iter_chunks(entry, chunker.key):
+            chunk_count += 1
+            yield {
+                # Deterministic ids make re-indexing the same file overwrite its points instead of duplicating them.
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{file_id}:{chunk['ordinal']}")),
+                "text": chunk["text"],
+                "metadata": {
+                    "file_id": str(file_id),
+                    "user_id": str(user_id),
+                    "file_sha256": sha,
+                    "chunk_index": chunk["ordinal"],
+                    "start_offset": chunk["start"],
+                    "end_offset": chunk["end"]
+                }
+            }
+        logger.debug("Document chunks created with length %d", chunk_count)
+        if progress is not None:
+            progress(files=1)
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """Groups an iterable into lists of at most `batch_size` items without materialising it."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def embed_chunk_batch(chunks: list) -> List[models.PointStruct]:
+    """Embeds one batch of chunks and returns the hybrid points that could be embedded."""
+    texts = [chunk["text"] for chunk in chunks]
+    with timed(INDEXING_STAGE_SECONDS, "dense_embedding"):
+        dense_embeddings = dense_embedder.embed(texts)
+    with timed(INDEXING_STAGE_SECONDS, "sparse_embedding"):
+        sparse_embeddings = sparse_embedder.embed(texts)
+
+    points = []
+    for chunk, dense_embedding, sparse_embedding in zip(chunks, dense_embeddings, sparse_embeddings):
+        if dense_embedding and sparse_embedding:
+            points.append(
+                models.PointStruct(
+                    id=chunk["id"],
+                    vector={
+                        "dense_vectors": dense_embedding,
+                        "sparse_vectors": sparse_embedding
+                    },
+                    payload={"text": chunk["text"], **chunk["metadata"]}
+                )
+            )
+    return points
+
+
+def index_chunks(qdrant_client: QdrantClient, collection_name: str, chunks: Iterable[dict],
+                 batch_size: int = settings.INDEXING_BATCH_SIZE,
+                 max_pending_batches: int = settings.INDEXING_MAX_PENDING_BATCHES,
+                 progress: Optional[Callable[..., None]] = None) -> int:
+    """Streams chunks through embedding and upserts them in fixed-size batches.
 
-def generate_sparse_embedding(text: str):
-    """Generates a sparse embedding for the given text using fastembed (BM25)."""
+    Embedding runs on the calling thread while a background thread upserts finished batches,
+    so the two overlap. The hand-off queue is bounded: when Qdrant falls behind, embedding
+    blocks instead of piling points up in memory. `progress`, if given, is called with
+    `embedded=` and `upserted=` counts as batches move through. Returns the number of points written.
+
+    Chunks that cannot be embedded (after the embedders' retries) are skipped so the rest still
+    get indexed; EmbeddingError is then raised at the end, so the caller never reports the files complete.
+    """
+    pending = queue.Queue(maxsize=max(1, max_pending_batches))
+    state = {"upserted": 0, "error": None}
+    dropped = 0
+
+    def upsert_worker():
+        while True:
+            points = pending.get()
+            if points is None:
+                return
+            if state["error"] is not None:
+                continue
+            try:
+                with timed(INDEXING_STAGE_SECONDS, "upsert"):
+                    call_with_retries(qdrant_client.upsert, collection_name=collection_name, wait=True, points=points)
+                state["upserted"] += len(points)
+                if progress is not None:
+                    progress(upserted=len(points))
+            except Exception as e:
+                state["error"] = e
+
+    worker = threading.Thread(target=upsert_worker, name=f"upsert-{collection_name}", daemon=True)
+    worker.start()
     try:
-        sparse_embedding_generator = sparse_embed_model.embed(text)
-        sparse_embedding_list = list(sparse_embedding_generator)
+        for batch in tqdm(iter_batches(chunks, batch_size)):
+            if state["error"] is not None:
+                break
+            points = embed_chunk_batch(batch)
+            dropped += len(batch) - len(points)
+            if progress is not None:
+                progress(embedded=len(points))
+            if points:
+                pending.put(points)
+    finally:
+        pending.put(None)
+        worker.join()
+
+    if state["error"] is not None:
+        raise state["error"]
+    if dropped:
+        raise EmbeddingError(f"{dropped} chunks could not be embedded and are missing from '{collection_name}'")
+    if state["upserted"]:
+        logger.info("Upserted %d hybrid points into '%s'", state["upserted"], collection_name)
+    else:
+        logger.warning("No embeddings generated to upsert into '%s'", collection_name)
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is not None:
+        logger.debug("Embedding cache stats: %s", embedding_cache.stats())
+    return state["upserted"]
 
-        sparse_embedding_object = sparse_embedding_list[0]
 
-        return models.SparseVector(
-            indices=sparse_embedding_object.indices.tolist(),
-            values=sparse_embedding_object.values.tolist()
+def add_files_to_vector_store(user_id: str, files: List[tuple],
+                              progress: Optional[Callable[..., None]] = None) -> bool:
+    """Indexes the given (file_id, file_path) files into the user's collection in a single pass,
+    without touching the user's other files. Raises EmbeddingError when some chunks were left out."""
+    try:
+        collection_name = collection_for_user(user_id)
+        qdrant_client = create_qdrant_client(collection_name)
+        if qdrant_client is None:
+            return False
+
+        # Drop points left over from a previous indexing of these files (e.g. they had more chunks then).
+        call_with_retries(
+            qdrant_client.delete,
+            collection_name=collection_name,
+            points_selector=models.FilterSelector(filter=file_ids_filter([file_id for file_id, _ in files], user_id)),
+            wait=True
         )
+        chunks = iter_files_chunks(user_id, files, get_collection_chunker(collection_name), progress)
+        index_chunks(qdrant_client, collection_name, chunks, progress=progress)
+        return True
+    except EmbeddingError:
+        raise
     except Exception as e:
-        print(f"Error generating sparse embedding: {e}")
-        return None
+        logger.error(f"Error processing file: {e}")
+        return False
 
-def extract_text_from_pdf(file_path):
-    """Extracts text from a PDF file."""
-    try:   
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return text
-    except Exception as e:
-        print(f"Error extracting text from PDF: {e}")
-        return ""
 
-def extract_text_from_html(file_path):
-    """Extracts text from an HTML file."""
+def remove_data_from_vector_store(user_id: str, file_id: str) -> bool:
+    """Deletes every point of the given file from the user's collection."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            
-            soup = BeautifulSoup(file, 'html.parser')
-            text = soup.get_text(separator=' ', strip=True)
-            return text
+        collection_name = collection_for_user(user_id)
+        qdrant_client = get_qdrant_client()
+        if not call_with_retries(qdrant_client.collection_exists, collection_name):
+            return True
+        call_with_retries(
+            qdrant_client.delete,
+            collection_name=collection_name,
+            points_selector=models.FilterSelector(filter=file_id_filter(file_id, user_id)),
+            wait=True
+        )
+        logger.info("Removed points of file %s from '%s'", file_id, collection_name)
+        return True
     except Exception as e:
-        print(f"Error extracting text from HTML: {e}")
-        return ""
+        logger.error(f"Error removing file from vector store: {e}")
+        return False
 
 
-def extract_text(file_path):
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext == '.pdf':
-        return extract_text_from_pdf(file_path)
-    elif ext in ['.html', '.htm']:
-        return extract_text_from_html(file_path)
-    else:
-        raise ValueError("Unsupported file type")
-
-def add_data_to_vector_store(user_id: str) -> bool:
+def rebuild_vector_store(user_id: str) -> bool:
+    """Drops the user's collection (or, in the shared collection, the user's points) and
+    re-indexes every file the user has uploaded."""
     try:
-        chunks = []
-        collection_name = f"{user_id}_collection"
-        files = FileCrud.get_files_by_userid(user_id=user_id)
-        for file in files:
-            print(f"Going through file {file}")
-            file_id = file[0]
-            file_name = file[2]
-            
-            file_path = os.path.join(settings.UPLOAD_DIR, user_id, file_name)
-            content = extract_text(file_path)
-           
-            doc_chunks = text_splitter.split_text(content)
-            print(f"Document chunks created with length {len(doc_chunks)}")
-            for _, chunk in enumerate(doc_chunks):
-                chunks.append({
-                    "id": str(uuid.uuid4()),
-                    "text": str(chunk),
-                    "metadata": {"file_id": str(file_id), "user_id": str(user_id)}
-                })
-            print(f"Chunking completed with total chunks are {len(chunks)}")
-
-        qdrant_client = create_qdrant_client(collection_name)
-        print("Client created successfully")
-
-        points_to_upsert = []
-        for chunk in tqdm(chunks):
-            dense_embedding = generate_gemini_embedding(chunk["text"])
-            sparse_embedding = generate_sparse_embedding(chunk["text"])
-            if dense_embedding and sparse_embedding:
-                points_to_upsert.append(
-                    models.PointStruct(
-                        id=chunk["id"],
-                        vector={
-                            "dense_vectors": dense_embedding,
-                            "sparse_vectors": sparse_embedding
-                        },
-                        payload={"text": chunk["text"], **chunk["metadata"]}
-                    )
-                )
+        collection_name = collection_for_user(user_id)
+        shared = is_shared_collection(collection_name)
+        qdrant_client = create_qdrant_client(collection_name, recreate=not shared)
+        if qdrant_client is None:
+            return False
+        if shared:
+            call_with_retries(
+                qdrant_client.delete,
+                collection_name=collection_name,
+                points_selector=models.FilterSelector(filter=models.Filter(must=[tenant_condition(user_id)])),
+                wait=True
+            )
 
-        if points_to_upsert:
-            try:
-                print(f"Upserting data ")
-                qdrant_client.upsert(
-                    collection_name=collection_name,
-                    wait=True,
-                    points=points_to_upsert
-                )
-                print(f"Successfully upserted {len(points_to_upsert)} hybrid points into '{collection_name}'.")
-            except Exception as e:
-                print(f"Error upserting points: {e}")
-        else:
-            print("No embeddings generated to upsert.")
-        
+        files = FileCrud.get_files_by_userid(user_id=user_id)
+        chunks = iter_files_chunks(user_id, [(file[0], file[5]) for file in files], get_collection_chunker(collection_name))
+        index_chunks(qdrant_client, collection_name, chunks)
+        return True
     except Exception as e:
-        print(f"Error processing file: {e}")
+        logger.error(f"Error rebuilding the index of user {user_id}: {e}")
         return False
-    
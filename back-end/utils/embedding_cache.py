@@ -0,0 +1,151 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from qdrant_client import models
+from config import settings
+
+
+def encode_dense(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def decode_dense(blob: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+def encode_sparse(vector: models.SparseVector) -> bytes:
+    indices = array("I", vector.indices)
+    values = array("f", vector.values)
+    return len(indices).to_bytes(4, "little") + indices.tobytes() + values.tobytes()
+
+
+def decode_sparse(blob: bytes) -> models.SparseVector:
+    size = int.from_bytes(blob[:4], "little")
+    split = 4 + size * 4
+    indices = array("I")
+    indices.frombytes(blob[4:split])
+    values = array("f")
+    values.frombytes(blob[split:])
+    return models.SparseVector.model_construct(indices=indices.tolist(), values=values.tolist())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent SQLite cache of embeddings keyed by (model name, task type, text hash).
+
+    The cache is bounded to `max_entries` rows; when it grows past that, the least recently
+    used entries are evicted. Hit and miss counters are kept for the lifetime of the process.
+    """
+
+    def __init__(self, path: str = settings.EMBEDDING_CACHE_PATH,
+                 max_entries: int = settings.EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                task_type TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                data BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, task_type, text_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, model: str, task_type: str, texts: List[str]) -> Dict[int, bytes]:
+        """Returns the cached blobs for `texts`, keyed by position. Missing texts are left out."""
+        if not texts:
+            return {}
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            unique_hashes = list(set(hashes))
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(unique_hashes), 500):
+                part = unique_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, data FROM embeddings WHERE model = ? AND task_type = ? AND text_hash IN ({placeholders})",
+                    (model, task_type, *part)
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND task_type = ? AND text_hash = ?",
+                    [(time.time(), model, task_type, digest) for digest in found]
+                )
+                self._conn.commit()
+            results = {position: found[digest] for position, digest in enumerate(hashes) if digest in found}
+            self.hits += len(results)
+            self.misses += len(texts) - len(results)
+        return results
+
+    def put_many(self, model: str, task_type: str, items: List[tuple]) -> None:
+        """Stores (text, blob) pairs and evicts the least recently used rows beyond the size bound."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, task_type, text_hash, data, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(model, task_type, text_hash(text), blob, now) for text, blob in items]
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                # Evict a little more than needed so we do not evict on every insert.
+                excess = count - self.max_entries + max(1, self.max_entries // 20)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for this process and the number of cached entries."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Returns the process-wide embedding cache, or None when caching is disabled."""
+    global _embedding_cache
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache()
+        return _embedding_cache
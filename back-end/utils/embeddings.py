@@ -0,0 +1,338 @@
+import asyncio
+import hashlib
+import logging
+import math
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+import google.generativeai as genai
+from fastembed import SparseTextEmbedding
+from qdrant_client import models
+from config import settings
+from utils.embedding_cache import decode_dense, decode_sparse, encode_dense, encode_sparse, get_embedding_cache
+
+logger = logging.getLogger(__name__)
+
+genai.configure(api_key=settings.GEMINI_KEY)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+# HTTP statuses of Gemini API errors (google.api_core exceptions carry them as `code`) worth retrying.
+_RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class EmbeddingError(RuntimeError):
+    pass
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return getattr(error, "code", None) in _RETRYABLE_STATUS_CODES
+
+
+class GeminiEmbedder:
+    """Dense embedder backed by the Gemini embedding API."""
+
+    # batchEmbedContents accepts at most 100 texts per request.
+    max_batch_size = 100
+
+    def __init__(self, model_name: str = settings.GEMINI_EMBEDDING_MODEL):
+        self.model_name = model_name
+
+    def embed(self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> List[List[float]]:
+        """Embeds a batch of texts in a single request."""
+        response = genai.embed_content(
+            model=self.model_name,
+            content=texts,
+            task_type=task_type
+        )
+        return response['embedding']
+
+    async def embed_async(self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> List[List[float]]:
+        """Embeds a batch of texts in a single request without blocking the event loop."""
+        response = await genai.embed_content_async(
+            model=self.model_name,
+            content=texts,
+            task_type=task_type
+        )
+        return response['embedding']
+
+
+class FakeEmbedder:
+    """Deterministic offline embedder for tests and benchmarks.
+
+    Vectors are signed feature-hashed bags of words: texts that share words point in similar
+    directions and identical texts always map to identical unit vectors, so retrieval quality
+    can be measured without network access.
+    """
+
+    max_batch_size = 1000
+
+    def __init__(self, dimension: int = settings.DENSE_VECTOR_SIZE, model_name: str = "fake"):
+        self.dimension = dimension
+        self.model_name = model_name
+
+    def _embed_one(self, text: str) -> List[float]:
+        values = [0.0] * self.dimension
+        for word in _WORD_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimension
+            values[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in values))
+        if not norm:
+            # Text without words still needs a valid (non-zero) vector for cosine distance.
+            values[0], norm = 1.0, 1.0
+        return [value / norm for value in values]
+
+    def embed(self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+    async def embed_async(self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> List[List[float]]:
+        return self.embed(texts, task_type)
+
+
+class BatchEmbedder:
+    """Groups texts into provider-sized batches and embeds them with bounded concurrency."""
+
+    def __init__(self, embedder, batch_size: int = settings.EMBEDDING_BATCH_SIZE,
+                 max_concurrency: int = settings.EMBEDDING_MAX_CONCURRENCY, cache=None):
+        self.embedder = embedder
+        self.batch_size = max(1, min(batch_size, embedder.max_batch_size))
+        self.max_concurrency = max(1, max_concurrency)
+        self.cache = cache
+
+    @property
+    def model_name(self) -> str:
+        return self.embedder.model_name
+
+    def _embed_batch(self, batch: List[str], task_type: str) -> List[Optional[List[float]]]:
+        """Embeds one batch, retrying transient failures with exponential backoff. Texts of a
+        batch that still fails get None."""
+        for attempt in range(settings.EMBEDDING_RETRIES + 1):
+            try:
+                return self.embedder.embed(batch, task_type=task_type)
+            except Exception as e:
+                if attempt == settings.EMBEDDING_RETRIES or not _is_retryable(e):
+                    logger.error(f"Error generating embeddings for a batch of {len(batch)} texts: {e}")
+                    return [None] * len(batch)
+                logger.warning(f"Embedding call failed ({e}), retrying (attempt {attempt + 1}/{settings.EMBEDDING_RETRIES})")
+                time.sleep(settings.EMBEDDING_RETRY_BACKOFF * (2 ** attempt))
+
+    def embed(self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> List[Optional[List[float]]]:
+        """Embeds all texts, preserving order. Texts of a failed batch get None.
+
+        When a cache is configured, only texts missing from it are sent to the model.
+        """
+        if not texts:
+            return []
+        if self.cache is None:
+            return self._embed_uncached(texts, task_type)
+
+        cached = self.cache.get_many(self.model_name, task_type, texts)
+        results = [decode_dense(cached[i]) if i in cached else None for i in range(len(texts))]
+        missing = [i for i in range(len(texts)) if i not in cached]
+        if missing:
+            embeddings = self._embed_uncached([texts[i] for i in missing], task_type)
+            for i, embedding in zip(missing, embeddings):
+                results[i] = embedding
+            self.cache.put_many(self.model_name, task_type, [
+                (texts[i], encode_dense(embedding)) for i, embedding in zip(missing, embeddings) if embedding
+            ])
+        return results
+
+    def _embed_uncached(self, texts: List[str], task_type: str) -> List[Optional[List[float]]]:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1 or self.max_concurrency == 1:
+            results = [self._embed_batch(batch, task_type) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                results = list(executor.map(lambda batch: self._embed_batch(batch, task_type), batches))
+        return [embedding for batch_result in results for embedding in batch_result]
+
+    async def embed_async(self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> List[Optional[List[float]]]:
+        """Async counterpart of `embed` for request handlers; cache lookups run in a worker thread."""
+        if not texts:
+            return []
+        if self.cache is None:
+            return await self._embed_uncached_async(texts, task_type)
+
+        cached = await asyncio.to_thread(self.cache.get_many, self.model_name, task_type, texts)
+        results = [decode_dense(cached[i]) if i in cached else None for i in range(len(texts))]
+        missing = [i for i in range(len(texts)) if i not in cached]
+        if missing:
+            embeddings = await self._embed_uncached_async([texts[i] for i in missing], task_type)
+            for i, embedding in zip(missing, embeddings):
+                results[i] = embedding
+            await asyncio.to_thread(self.cache.put_many, self.model_name, task_type, [
+                (texts[i], encode_dense(embedding)) for i, embedding in zip(missing, embeddings) if embedding
+            ])
+        return results
+
+    async def _embed_uncached_async(self, texts: List[str], task_type: str) -> List[Optional[List[float]]]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def embed_batch(batch):
+            async with semaphore:
+                for attempt in range(settings.EMBEDDING_RETRIES + 1):
+                    try:
+                        return await self.embedder.embed_async(batch, task_type=task_type)
+                    except Exception as e:
+                        if attempt == settings.EMBEDDING_RETRIES or not _is_retryable(e):
+                            logger.error(f"Error generating embeddings for a batch of {len(batch)} texts: {e}")
+                            return [None] * len(batch)
+                        logger.warning(f"Embedding call failed ({e}), retrying "
+                                       f"(attempt {attempt + 1}/{settings.EMBEDDING_RETRIES})")
+                        await asyncio.sleep(settings.EMBEDDING_RETRY_BACKOFF * (2 ** attempt))
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+        return [embedding for batch_result in results for embedding in batch_result]
+
+
+_worker_sparse_model = None
+
+
+def _init_sparse_worker(model_name: str) -> None:
+    """Loads the BM25 model once in each process of the sparse embedding pool."""
+    global _worker_sparse_model
+    _worker_sparse_model = SparseTextEmbedding(model_name=model_name)
+
+
+def _embed_sparse_in_worker(texts: List[str], batch_size: int) -> List[tuple]:
+    """Embeds texts inside a pool process; returns (indices, values) lists, which pickle cheaply."""
+    return [
+        (embedding.indices.tolist(), embedding.values.tolist())
+        for embedding in _worker_sparse_model.embed(texts, batch_size=batch_size)
+    ]
+
+
+class SparseEmbedder:
+    """BM25 sparse embedder that embeds whole chunk lists in batches.
+
+    With `parallel` set, documents are embedded in a pool of worker processes that is started
+    on first use and kept for the life of the embedder, so each worker loads the model once.
+    Every call is split across all workers, so even a single indexing batch uses them.
+    """
+
+    # BM25 has no task types; a fixed value keeps the cache key shape shared with dense entries.
+    cache_task_type = "bm25"
+
+    def __init__(self, model_name: str = settings.SPARSE_EMBEDDING_MODEL,
+                 batch_size: int = settings.SPARSE_EMBEDDING_BATCH_SIZE,
+                 parallel: Optional[int] = settings.SPARSE_EMBEDDING_PARALLEL, cache=None):
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.parallel = parallel
+        self.workers = 0 if parallel is None else (parallel or os.cpu_count())
+        self.cache = cache
+        self._model = None
+        self._pool = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self) -> SparseTextEmbedding:
+        """The fastembed model, loaded (and downloaded if needed) on first use rather than on import."""
+        with self._model_lock:
+            if self._model is None:
+                self._model = SparseTextEmbedding(model_name=self.model_name)
+            return self._model
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._model_lock:
+            if self._pool is None:
+                # "spawn", as for text extraction: forking the threaded API process is unsafe.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_sparse_worker,
+                    initargs=(self.model_name,)
+                )
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        with self._model_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def embed(self, texts: List[str]) -> List[Optional[models.SparseVector]]:
+        """Embeds all texts, preserving order, consulting the cache first when one is configured."""
+        if not texts:
+            return []
+        if self.cache is None:
+            return self._embed_uncached(texts)
+
+        cached = self.cache.get_many(self.model_name, self.cache_task_type, texts)
+        results = [decode_sparse(cached[i]) if i in cached else None for i in range(len(texts))]
+        missing = [i for i in range(len(texts)) if i not in cached]
+        if missing:
+            embeddings = self._embed_uncached([texts[i] for i in missing])
+            for i, embedding in zip(missing, embeddings):
+                results[i] = embedding
+            self.cache.put_many(self.model_name, self.cache_task_type, [
+                (texts[i], encode_sparse(embedding)) for i, embedding in zip(missing, embeddings) if embedding
+            ])
+        return results
+
+    def embed_query(self, text: str) -> Optional[models.SparseVector]:
+        """Embeds a search query. BM25 weights query terms differently from documents, so this
+        uses fastembed's query_embed and bypasses the document cache."""
+        try:
+            embedding = next(iter(self.model.query_embed(text)))
+            return models.SparseVector.model_construct(
+                indices=embedding.indices.tolist(),
+                values=embedding.values.tolist()
+            )
+        except Exception as e:
+            logger.error(f"Error generating sparse query embedding: {e}")
+            return None
+
+    def _embed_uncached(self, texts: List[str]) -> List[Optional[models.SparseVector]]:
+        """Embeds all texts in one pass (across the worker pool when configured), preserving order."""
+        try:
+            if self.workers:
+                pool = self._get_pool()
+                size = math.ceil(len(texts) / self.workers)
+                slices = [texts[i:i + size] for i in range(0, len(texts), size)]
+                try:
+                    results = list(pool.map(_embed_sparse_in_worker, slices, [self.batch_size] * len(slices)))
+                except BrokenProcessPool:
+                    # A worker died (e.g. out of memory); start a new pool on the next call.
+                    self._reset_pool(pool)
+                    raise
+                pairs = [pair for result in results for pair in result]
+            else:
+                pairs = [
+                    (embedding.indices.tolist(), embedding.values.tolist())
+                    for embedding in self.model.embed(texts, batch_size=self.batch_size)
+                ]
+            # The arrays come straight from fastembed, so pydantic validation is skipped.
+            return [models.SparseVector.model_construct(indices=indices, values=values) for indices, values in pairs]
+        except Exception as e:
+            logger.error(f"Error generating sparse embeddings for {len(texts)} texts: {e}")
+            return [None] * len(texts)
+
+
+_dense_embedders = {
+    "gemini": GeminiEmbedder,
+    "fake": FakeEmbedder,
+}
+
+
+def get_dense_embedder(name: str = settings.DENSE_EMBEDDER) -> BatchEmbedder:
+    """Returns a batch embedder for the configured dense embedding backend."""
+    if name not in _dense_embedders:
+        raise ValueError(f"Unknown dense embedder '{name}'. Expected one of {list(_dense_embedders)}")
+    return BatchEmbedder(_dense_embedders[name](), cache=get_embedding_cache())
+
+
+def register_dense_embedder(name: str, factory) -> None:
+    """Registers an additional dense embedder so it can be selected with DENSE_EMBEDDER."""
+    _dense_embedders[name] = factory
@@ -1,4 +1,5 @@
-from core.database import get_db_connection
+import asyncio
+from core.database import get_db_connection, transaction
 from typing import Any
 
 
@@ -14,10 +15,7 @@ def execute_fetch_query(query: str, params: tuple = ()) -> Any:
         Any: The result of the query execution.
     """
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        result = cursor.fetchall()
-        return result
+        return conn.execute(query, params).fetchall()
 
 def execute_insert_or_update_query(query: str, params: tuple = ()) -> bool:
     """
@@ -30,15 +28,30 @@ def execute_insert_or_update_query(query: str, params: tuple = ()) -> bool:
     Returns:
         bool: True if the insert was successful, False otherwise.
     """
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        conn.commit()
+    with transaction() as conn:
+        cursor = conn.execute(query, params)
         return cursor.rowcount > 0
-    
-def add_data_to_vector_store(user_id: str, file_id:str, file_name: str, file_content: bytes) -> bool:
-    pass
 
-def remove_data_to_vector_store(user_id: str, file_id:str, file_name: str, file_content: bytes) -> bool:
-    pass
+def execute_insert_many_query(query: str, params_list: list) -> int:
+    """
+    Execute an insert SQL query once per parameter tuple, all in one transaction.
+
+    Returns:
+        int: The number of rows written.
+    """
+    with transaction() as conn:
+        cursor = conn.executemany(query, params_list)
+        return cursor.rowcount
 
+async def execute_fetch_query_async(query: str, params: tuple = ()) -> Any:
+    """
+    Async variant of `execute_fetch_query`. The query runs on a worker thread
+    (with that thread's pooled connection) so the event loop is never blocked.
+    """
+    return await asyncio.to_thread(execute_fetch_query, query, params)
+
+async def execute_insert_or_update_query_async(query: str, params: tuple = ()) -> bool:
+    """
+    Async variant of `execute_insert_or_update_query`, run on a worker thread.
+    """
+    return await asyncio.to_thread(execute_insert_or_update_query, query, params)
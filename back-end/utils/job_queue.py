@@ -0,0 +1,109 @@
+import fcntl
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UserSerializedQueue:
+    """In-process job queue with bounded concurrency and per-user serialization.
+
+    At most `max_workers` jobs run at once, and jobs of the same user always run one after
+    another in submission order. A worker only picks up a user while none of that user's
+    jobs is running, so waiting jobs never occupy a worker slot.
+
+    Serialization is per process only. With several server processes (uvicorn --workers), each
+    has its own queue, so one user's index and remove jobs submitted to different processes can
+    run at the same time and out of order; claim_job only guarantees each job runs once.
+    """
+
+    def __init__(self, max_workers: int = settings.INDEXING_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="indexing")
+        self._lock = threading.Lock()
+        self._pending: Dict[str, deque] = {}
+
+    def submit(self, user_id: str, task: Callable[[], None]) -> None:
+        """Queues `task` to run after every task already queued for `user_id`."""
+        with self._lock:
+            if user_id in self._pending:
+                self._pending[user_id].append(task)
+                return
+            self._pending[user_id] = deque([task])
+        self._executor.submit(self._drain, user_id)
+
+    def _drain(self, user_id: str) -> None:
+        while True:
+            with self._lock:
+                tasks = self._pending[user_id]
+                if not tasks:
+                    del self._pending[user_id]
+                    return
+                task = tasks[0]
+            try:
+                task()
+            except Exception as e:
+                logger.error(f"Error running background job for user {user_id}: {e}")
+            finally:
+                with self._lock:
+                    self._pending[user_id].popleft()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class WorkerLock:
+    """Lets server processes sharing the database tell whether the process running a job is alive.
+
+    Each process holds an exclusive lock on a file named after its worker id for as long as it
+    lives. The operating system releases the lock when the process dies, so a job whose worker's
+    lock can be taken was orphaned by a crash or restart.
+    """
+
+    def __init__(self, lock_dir: str = settings.INDEXING_WORKER_LOCK_DIR):
+        self.lock_dir = lock_dir
+        self.worker_id = uuid.uuid4().hex
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _path(self, worker_id: str) -> str:
+        return os.path.join(self.lock_dir, f"{worker_id}.lock")
+
+    def acquire(self) -> str:
+        """Takes this process's lock (once) and returns its worker id."""
+        with self._lock:
+            if self._file is None:
+                os.makedirs(self.lock_dir, exist_ok=True)
+                self._file = open(self._path(self.worker_id), "w")
+                fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return self.worker_id
+
+    def is_alive(self, worker_id) -> bool:
+        if not worker_id:
+            return False
+        if worker_id == self.worker_id:
+            return True
+        path = self._path(worker_id)
+        try:
+            with open(path, "a") as file:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        except FileNotFoundError:
+            return False
+        # The lock was free, so its owner is gone.
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return False
+
+
+indexing_queue = UserSerializedQueue()
+worker_lock = WorkerLock()
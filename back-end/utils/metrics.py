@@ -0,0 +1,31 @@
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+
+# Request stages range from sub-millisecond cache hits to multi-second generations.
+CHAT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Indexing stages cover single batches up to whole jobs.
+INDEXING_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+CHAT_STAGE_SECONDS = Histogram(
+    "rag_chat_stage_seconds", "Latency of each stage of a chat turn.", ["stage"], buckets=CHAT_BUCKETS
+)
+INDEXING_STAGE_SECONDS = Histogram(
+    "rag_indexing_stage_seconds", "Latency of each stage of document indexing.", ["stage"], buckets=INDEXING_BUCKETS
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, stage: str):
+    """Observes the duration of the enclosed block in `histogram` under the given stage label."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def render_metrics():
+    """Returns (body, content type) of the Prometheus text exposition of all metrics."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import threading
+from typing import Optional
+
+from cachetools import TTLCache
+from config import settings
+from utils.data_indexing_pipeline import dense_embedder, sparse_embedder
+from utils.embedding_cache import decode_dense, decode_sparse, encode_dense, encode_sparse, get_embedding_cache
+
+logger = logging.getLogger(__name__)
+
+QUERY_TASK_TYPE = "RETRIEVAL_QUERY"
+SPARSE_QUERY_TASK_TYPE = "bm25_query"
+
+
+def normalize_query(query: str) -> str:
+    """Collapses whitespace so trivially different spellings of a query share one cache entry."""
+    return " ".join(query.split())
+
+
+class QueryEmbeddingCache:
+    """Two-tier cache of query embeddings.
+
+    The first tier is an in-process LRU with a TTL. The optional second tier is the persistent
+    SQLite embedding cache, which every worker process on the host shares. Keys are
+    (model, task type, whitespace-normalized query). Case is kept: the embedding models are
+    case-sensitive, so differently capitalised queries have different embeddings.
+    """
+
+    def __init__(self, maxsize: int = settings.QUERY_CACHE_MAX_ENTRIES, ttl: float = settings.QUERY_CACHE_TTL_SECONDS,
+                 disk_cache=None):
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.disk_cache = disk_cache
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get_or_embed(self, model: str, task_type: str, query: str, embed, encode, decode):
+        """Returns the cached embedding for `query`, computing it with `embed(text)` on a miss."""
+        text = normalize_query(query)
+        key = (model, task_type, text)
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self.memory_hits += 1
+                return value
+
+        if self.disk_cache is not None:
+            cached = await asyncio.to_thread(self.disk_cache.get_many, model, task_type, [text])
+            if cached:
+                value = decode(cached[0])
+                with self._lock:
+                    self.disk_hits += 1
+                    self._memory[key] = value
+                return value
+
+        with self._lock:
+            self.misses += 1
+        value = await embed(text)
+        if value is None:
+            return None
+        with self._lock:
+            self._memory[key] = value
+        if self.disk_cache is not None:
+            await asyncio.to_thread(self.disk_cache.put_many, model, task_type, [(text, encode(value))])
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+query_embedding_cache = QueryEmbeddingCache(disk_cache=get_embedding_cache() if settings.QUERY_CACHE_DISK_TIER else None)
+
+
+async def _embed_dense_query(text: str) -> Optional[list]:
+    try:
+        return (await dense_embedder.embed_async([text], task_type=QUERY_TASK_TYPE))[0]
+    except Exception as e:
+        logger.error(f"Error generating Gemini query embedding: {e}")
+        return None
+
+
+async def _embed_sparse_query(text: str):
+    # BM25 runs on the CPU, so it goes to a worker thread.
+    return await asyncio.to_thread(sparse_embedder.embed_query, text)
+
+
+async def embed_query_dense(query: str) -> Optional[list]:
+    """Dense embedding of a search query (RETRIEVAL_QUERY task type), served from the query cache when possible."""
+    return await query_embedding_cache.get_or_embed(
+        dense_embedder.model_name, QUERY_TASK_TYPE, query, _embed_dense_query, encode_dense, decode_dense
+    )
+
+
+async def embed_query_sparse(query: str):
+    """BM25 embedding of a search query, served from the query cache when possible."""
+    return await query_embedding_cache.get_or_embed(
+        sparse_embedder.model_name, SPARSE_QUERY_TASK_TYPE, query, _embed_sparse_query, encode_sparse, decode_sparse
+    )
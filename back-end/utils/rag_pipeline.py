@@ -1,96 +1,215 @@
-from utils.data_indexing_pipeline import generate_gemini_embedding, generate_sparse_embedding, create_qdrant_client
+import asyncio
+import logging
+import time
+from typing import Optional
+from utils.query_cache import embed_query_dense, embed_query_sparse
 from qdrant_client import models
 from config import settings
 import google.generativeai as genai
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
+from utils.vector_store import get_async_qdrant_client, call_with_retries_async, dense_search_params, tenant_filter
+from utils.timing import StageTimer
+from utils.context_builder import build_context
+from utils.reranker import reranker
 
 genai.configure(api_key=settings.GEMINI_KEY)
-QDRANT_STORAGE_PATH = "./qdrant_storage"
+logger = logging.getLogger(__name__)
 
-def hybrid_search(query: str, collection_name: str, top_k: int = 5, dense_weight: float = 0.7, sparse_weight: float = 0.3):
+FUSION_MODES = {
+    "rrf": models.Fusion.RRF,
+    "dbsf": models.Fusion.DBSF,
+}
 
-    try:
-        query_dense_embedding = generate_gemini_embedding(query)
-        query_sparse_embedding = generate_sparse_embedding(query)
-        qdrant_client = QdrantClient(url="http://127.0.0.1:6333", prefer_grpc=False)
 
-        points, _ = qdrant_client.scroll(
-            collection_name=collection_name,
-            limit=5,
-            with_payload=True,
-            with_vectors=False 
-        )
-        print(points,"This is test whether vector database is populated or not")
-        
-        dense_results = qdrant_client.search(
+class HybridResult:
+    def __init__(self, id, score, payload):
+        self.id = id
+        self.score = score
+        self.payload = payload
+
+
+async def fused_search(qdrant_client: AsyncQdrantClient, collection_name: str, query_dense_embedding,
+                       query_sparse_embedding, top_k: int, fusion: str, timer: StageTimer,
+                       query_filter: Optional[models.Filter] = None):
+    """Runs dense and sparse prefetches and fuses them inside Qdrant in a single query.
+    Only the final top_k points come back with payloads."""
+    response = await timer.track("fused_search", call_with_retries_async(
+        qdrant_client.query_points,
+        collection_name=collection_name,
+        prefetch=[
+            models.Prefetch(query=query_dense_embedding, using="dense_vectors", limit=top_k * 2,
+                            params=dense_search_params(), filter=query_filter),
+            models.Prefetch(query=query_sparse_embedding, using="sparse_vectors", limit=top_k * 2,
+                            filter=query_filter),
+        ],
+        query=models.FusionQuery(fusion=FUSION_MODES[fusion]),
+        limit=top_k,
+        with_payload=True,
+        with_vectors=False
+    ))
+    return [HybridResult(point.id, point.score, point.payload) for point in response.points]
+
+
+async def weighted_search(qdrant_client: AsyncQdrantClient, collection_name: str, query_dense_embedding,
+                          query_sparse_embedding, top_k: int, dense_weight: float, sparse_weight: float,
+                          timer: StageTimer, query_filter: Optional[models.Filter] = None):
+    """Runs dense and sparse searches separately and fuses their weighted raw scores client-side."""
+    # Dense and sparse searches are independent, so both requests are in flight together.
+    dense_results, sparse_results = await asyncio.gather(
+        timer.track("dense_search", call_with_retries_async(
+            qdrant_client.search,
             collection_name=collection_name,
             query_vector=models.NamedVector(
                 name="dense_vectors",
                 vector=query_dense_embedding
             ),
+            query_filter=query_filter,
+            search_params=dense_search_params(),
             limit=top_k * 2,
             with_payload=True,
             with_vectors=False
-        )
-        print(f"Dense results: {dense_results}")
-        # Perform sparse vector search
-        sparse_results = qdrant_client.search(
+        )),
+        timer.track("sparse_search", call_with_retries_async(
+            qdrant_client.search,
             collection_name=collection_name,
             query_vector=models.NamedSparseVector(
                 name="sparse_vectors",
                 vector=query_sparse_embedding
             ),
-            limit=top_k * 2,  
+            query_filter=query_filter,
+            limit=top_k * 2,
             with_payload=True,
             with_vectors=False
-        )
-        print(f"Sparse results: {sparse_results}")
-        
-        combined_results = {}
-        
-        for result in dense_results:
-            doc_id = result.id
+        ))
+    )
+    logger.debug("Dense results: %s", dense_results)
+    logger.debug("Sparse results: %s", sparse_results)
+
+    fusion_started = time.perf_counter()
+    combined_results = {}
+
+    for result in dense_results:
+        doc_id = result.id
+        combined_results[doc_id] = {
+            'dense_score': result.score * dense_weight,
+            'sparse_score': 0.0,
+            'payload': result.payload,
+            'id': result.id
+        }
+
+    for result in sparse_results:
+        doc_id = result.id
+        if doc_id in combined_results:
+            combined_results[doc_id]['sparse_score'] = result.score * sparse_weight
+        else:
             combined_results[doc_id] = {
-                'dense_score': result.score * dense_weight,
-                'sparse_score': 0.0,
+                'dense_score': 0.0,
+                'sparse_score': result.score * sparse_weight,
                 'payload': result.payload,
                 'id': result.id
             }
+    logger.debug("Combined results: %s", combined_results)
+    final_results = []
+    for doc_id, data in combined_results.items():
+        final_score = data['dense_score'] + data['sparse_score']
+        final_results.append(HybridResult(doc_id, final_score, data['payload']))
+
+    final_results.sort(key=lambda x: x.score, reverse=True)
+    timer.record("fusion", fusion_started)
+    return final_results[:top_k]
+
+
+async def single_search(qdrant_client: AsyncQdrantClient, collection_name: str, using: str, query_embedding,
+                        top_k: int, timer: StageTimer, query_filter: Optional[models.Filter] = None):
+    """Searches one vector space alone, for when the query's other embedding could not be computed."""
+    dense = using == "dense_vectors"
+    response = await timer.track("dense_search" if dense else "sparse_search", call_with_retries_async(
+        qdrant_client.query_points,
+        collection_name=collection_name,
+        query=query_embedding,
+        using=using,
+        query_filter=query_filter,
+        search_params=dense_search_params() if dense else None,
+        limit=top_k,
+        with_payload=True,
+        with_vectors=False
+    ))
+    return [HybridResult(point.id, point.score, point.payload) for point in response.points]
+
+
+async def _precomputed(value):
+    return value
+
+
+async def hybrid_search(query: str, collection_name: str, top_k: int = 5, dense_weight: float = 0.7,
+                        sparse_weight: float = 0.3, fusion: str = settings.HYBRID_FUSION,
+                        query_dense_embedding=None, query_sparse_embedding=None,
+                        timer: Optional[StageTimer] = None, user_id: Optional[str] = None,
+                        raise_errors: bool = False):
+    """Hybrid dense + sparse retrieval.
+
+    `fusion` selects how the two result lists are combined: "rrf" or "dbsf" fuse server-side in one
+    Qdrant query, "weighted" keeps the client-side dense_weight/sparse_weight score blend.
+    Embeddings the caller already computed are used as-is; the missing ones are computed concurrently.
+    Searches of the shared collection are restricted to `user_id`'s points.
+    Failures return no results, or are raised with `raise_errors` so callers can tell them from an empty match.
+    """
+    timer = timer or StageTimer()
+    try:
+        query_filter = tenant_filter(collection_name, user_id)
+        query_dense_embedding, query_sparse_embedding = await asyncio.gather(
+            _precomputed(query_dense_embedding) if query_dense_embedding is not None
+            else timer.track("dense_query_embedding", embed_query_dense(query)),
+            _precomputed(query_sparse_embedding) if query_sparse_embedding is not None
+            else timer.track("sparse_query_embedding", embed_query_sparse(query))
+        )
+        qdrant_client = get_async_qdrant_client()
+
+        if fusion != "weighted" and fusion not in FUSION_MODES:
+            raise ValueError(f"Unknown fusion mode '{fusion}'. Expected 'weighted' or one of {list(FUSION_MODES)}")
+        if query_dense_embedding is None and query_sparse_embedding is None:
+            raise ValueError("Neither a dense nor a sparse embedding could be computed for the query")
+        if query_dense_embedding is None or query_sparse_embedding is None:
+            # A query-less prefetch would scroll arbitrary points into the fusion, so search the remaining space alone.
+            using, query_embedding = (("sparse_vectors", query_sparse_embedding) if query_dense_embedding is None
+                                      else ("dense_vectors", query_dense_embedding))
+            logger.warning(f"Query embedding missing, falling back to {using} only")
+            final_results = await single_search(qdrant_client, collection_name, using, query_embedding,
+                                                top_k, timer, query_filter)
+        elif fusion == "weighted":
+            final_results = await weighted_search(qdrant_client, collection_name, query_dense_embedding,
+                                                  query_sparse_embedding, top_k, dense_weight, sparse_weight, timer,
+                                                  query_filter)
+        else:
+            final_results = await fused_search(qdrant_client, collection_name, query_dense_embedding,
+                                               query_sparse_embedding, top_k, fusion, timer, query_filter)
+        logger.debug("Final sorted results: %s", final_results)
+        return final_results
 
-        for result in sparse_results:
-            doc_id = result.id
-            if doc_id in combined_results:
-                combined_results[doc_id]['sparse_score'] = result.score * sparse_weight
-            else:
-                combined_results[doc_id] = {
-                    'dense_score': 0.0,
-                    'sparse_score': result.score * sparse_weight,
-                    'payload': result.payload,
-                    'id': result.id
-                }
-        print(f"Combined results: {combined_results}")
-        final_results = []
-        for doc_id, data in combined_results.items():
-            final_score = data['dense_score'] + data['sparse_score']
-            
-            class HybridResult:
-                def __init__(self, id, score, payload):
-                    self.id = id
-                    self.score = score
-                    self.payload = payload
-            
-            final_results.append(HybridResult(doc_id, final_score, data['payload']))
-        
-        final_results.sort(key=lambda x: x.score, reverse=True)
-        print(f"Final sorted results: {final_results}")
-        return final_results[:top_k]
-        
     except Exception as e:
-        print(f"Error during hybrid search: {e}")
+        logger.error(f"Error during hybrid search: {e}")
+        if raise_errors:
+            raise
         return []
 
 
-def prompt_expansion(query: str, chat_history: list):
+async def retrieve(query: str, collection_name: str, top_k: int, dense_weight: float, sparse_weight: float,
+                   fusion: str, query_sparse_embedding, timer: StageTimer, user_id: Optional[str] = None):
+    """Hybrid search, widened to RERANK_CANDIDATES and narrowed back to top_k by the reranker when it is enabled.
+    Raises when the search fails, so an answer is never generated (or cached) from a context that was lost."""
+    if not settings.RERANK_ENABLED:
+        return await timer.track("retrieval", hybrid_search(
+            query, collection_name, top_k, dense_weight, sparse_weight, fusion,
+            query_sparse_embedding=query_sparse_embedding, timer=timer, user_id=user_id, raise_errors=True
+        ))
+    candidates = await timer.track("retrieval", hybrid_search(
+        query, collection_name, max(top_k, settings.RERANK_CANDIDATES), dense_weight, sparse_weight, fusion,
+        query_sparse_embedding=query_sparse_embedding, timer=timer, user_id=user_id, raise_errors=True
+    ))
+    return await timer.track("rerank", reranker.rerank_async(query, candidates, top_k))
+
+
+async def prompt_expansion(query: str, chat_history: str):
     try:
         model = genai.GenerativeModel('gemini-2.0-flash')
         
@@ -105,16 +224,16 @@ def prompt_expansion(query: str, chat_history: list):
         Expanded Query:
         """
         
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         expanded_query = response.text.strip()
         return expanded_query
         
     except Exception as e:
-        print(f"Error generating expanded query with Gemini: {e}")
+        logger.error(f"Error generating expanded query with Gemini: {e}")
         expanded_query = f"Error generating expanded query: {e}"
         return query
 
-def create_chat_name(chat_history: list):
+async def create_chat_name(chat_history: str):
     try:
         model = genai.GenerativeModel('gemini-2.0-flash')
         
@@ -129,28 +248,68 @@ def create_chat_name(chat_history: list):
         chat_name:
         """
         
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         expanded_query = response.text.strip()
         return expanded_query
         
     except Exception as e:
-        print(f"Error generating expanded query with Gemini: {e}")
+        logger.error(f"Error generating expanded query with Gemini: {e}")
         expanded_query = f"Error generating expanded query: {e}"
         return "New Chat"
 
-def query_with_gemini_generation(query: str, collection_name: str, top_k: int = 3, 
-                                dense_weight: float = 0.7, sparse_weight: float = 0.3):
-    print(f"Querying with Gemini: {query}")
-    search_results = hybrid_search(query, collection_name, top_k, dense_weight, sparse_weight)
-    print(f"Search results: {search_results}")
-    
-    context_texts = []
-    retrieved_docs = []
+async def summarize_conversation(summary: str, turns: list) -> Optional[str]:
+    """Folds `turns` into the running `summary`. Returns None if the summary could not be generated."""
+    try:
+        model = genai.GenerativeModel('gemini-2.0-flash')
+        
+        turns_text = "\n\n".join(turns)
+        prompt = f"""
+        Update the summary of a conversation between a user and an assistant with the new turns below.
+        Keep the facts, names, documents and open questions the user may refer back to.
+        The summary should be no longer than {settings.CHAT_MEMORY_SUMMARY_MAX_WORDS} words.
+        
+        Current Summary:
+        {summary or "(empty)"}
+        
+        New Turns:
+        {turns_text}
+        
+        Updated Summary:
+        """
+        
+        response = await model.generate_content_async(prompt)
+        return response.text.strip()
+        
+    except Exception as e:
+        logger.error(f"Error summarizing conversation with Gemini: {e}")
+        return None
+
+async def query_with_gemini_generation(query: str, collection_name: str, top_k: int = 3, 
+                                dense_weight: float = 0.7, sparse_weight: float = 0.3,
+                                fusion: str = settings.HYBRID_FUSION, query_sparse_embedding=None,
+                                timer: Optional[StageTimer] = None, user_id: Optional[str] = None):
+    logger.debug("Querying with Gemini: %s", query)
+    timer = timer or StageTimer()
+    try:
+        search_results = await retrieve(query, collection_name, top_k, dense_weight, sparse_weight, fusion,
+                                        query_sparse_embedding, timer, user_id)
+    except Exception as e:
+        return {
+            "query": query,
+            "retrieved_documents": [],
+            "context_tokens": 0,
+            "generated_response": f"Error retrieving documents: {e}",
+            "error": str(e)
+        }
+    logger.debug("Search results: %s", search_results)
     
-    for result in search_results:
-        context_texts.append(result.payload["text"])
+    retrieved_docs = [str(result.id) for result in search_results]
+    error = None
     
-    context = "\n\n".join(context_texts)
+    packed = build_context(search_results)
+    context = packed.text
+    logger.debug("Context: %d tokens in %d section(s), %d duplicate(s) and %d over budget dropped",
+                 packed.tokens, len(packed.sections), packed.dropped_duplicates, packed.dropped_over_budget)
     
 
     try:
@@ -168,35 +327,40 @@ def query_with_gemini_generation(query: str, collection_name: str, top_k: int =
         Answer:
         """
         
-        response = model.generate_content(prompt)
+        response = await timer.track("generation", model.generate_content_async(prompt))
         generated_response = response.text
-        print(f"Generated response: {generated_response}")
+        logger.debug("Generated response: %s", generated_response)
         
     except Exception as e:
-        print(f"Error generating response with Gemini: {e}")
+        logger.error(f"Error generating response with Gemini: {e}")
         generated_response = f"Error generating response: {e}"
+        error = str(e)
     
     return {
         "query": query,
         "retrieved_documents": retrieved_docs,
-        "generated_response": generated_response
+        "context_tokens": packed.tokens,
+        "generated_response": generated_response,
+        "error": error
     }
     
-def query_with_gemini_generation_stream(query: str, collection_name: str, top_k: int = 3, 
-                                      dense_weight: float = 0.7, sparse_weight: float = 0.3):
+async def query_with_gemini_generation_stream(query: str, collection_name: str, top_k: int = 3, 
+                                      dense_weight: float = 0.7, sparse_weight: float = 0.3,
+                                      fusion: str = settings.HYBRID_FUSION, query_sparse_embedding=None,
+                                      timer: Optional[StageTimer] = None, user_id: Optional[str] = None):
     """Generator function that yields streaming response chunks."""
-    print(f"Querying with Gemini (streaming): {query}")
+    logger.debug("Querying with Gemini (streaming): %s", query)
+    timer = timer or StageTimer()
     
     try:
-        # Get search results (same as before)
-        search_results = hybrid_search(query, collection_name, top_k, dense_weight, sparse_weight)
-        print(f"Search results: {search_results}")
+        search_results = await retrieve(query, collection_name, top_k, dense_weight, sparse_weight, fusion,
+                                        query_sparse_embedding, timer, user_id)
+        logger.debug("Search results: %s", search_results)
         
-        context_texts = []
-        for result in search_results:
-            context_texts.append(result.payload["text"])
-        
-        context = "\n\n".join(context_texts)
+        packed = build_context(search_results)
+        context = packed.text
+        logger.debug("Context: %d tokens in %d section(s), %d duplicate(s) and %d over budget dropped",
+                     packed.tokens, len(packed.sections), packed.dropped_duplicates, packed.dropped_over_budget)
         
         # Generate streaming response
         model = genai.GenerativeModel('gemini-2.0-flash')
@@ -214,9 +378,12 @@ def query_with_gemini_generation_stream(query: str, collection_name: str, top_k:
         """
         
         # Use streaming generation
-        response = model.generate_content(prompt, stream=True)
+        generation_started = time.perf_counter()
+        response = await model.generate_content_async(prompt, stream=True)
         
-        for chunk in response:
+        async for chunk in response:
+            if "first_token" not in timer.stages:
+                timer.mark("first_token")
             if chunk.text:
                 yield {
                     "content": chunk.text,
@@ -224,15 +391,20 @@ def query_with_gemini_generation_stream(query: str, collection_name: str, top_k:
                     "done": False
                 }
         
+        timer.record("generation", generation_started)
+        
         # Send completion signal
         yield {
             "content": "",
             "type": "done", 
-            "done": True
+            "done": True,
+            "retrieved_documents": [str(result.id) for result in search_results],
+            "context_tokens": packed.tokens,
+            "timings": timer.summary()
         }
         
     except Exception as e:
-        print(f"Error generating streaming response with Gemini: {e}")
+        logger.error(f"Error generating streaming response with Gemini: {e}")
         yield {
             "content": f"Error generating response: {e}",
             "type": "error",
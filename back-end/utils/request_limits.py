@@ -0,0 +1,70 @@
+import json
+from typing import Dict
+
+from fastapi import HTTPException
+
+
+class RequestBodyTooLarge(HTTPException):
+    def __init__(self, max_bytes: int):
+        super().__init__(status_code=413, detail=f"Request body exceeds the limit of {max_bytes} bytes")
+
+
+class BodySizeLimitMiddleware:
+    """Rejects request bodies larger than the limit configured for their path, while they arrive.
+
+    Starlette writes a whole multipart body to a temporary file before the endpoint runs, so a
+    size check in the endpoint comes too late to stop an oversized upload from filling the disk.
+    Bodies announcing a larger Content-Length are refused before anything is read; the rest are
+    counted as they are received and aborted with 413 as soon as they cross the limit.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            await self._reject(send, RequestBodyTooLarge(max_bytes))
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise RequestBodyTooLarge(max_bytes)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except RequestBodyTooLarge as e:
+            # FastAPI normally turns the exception into the 413 response itself; this covers apps that don't.
+            if response_started:
+                raise
+            await self._reject(send, e)
+
+    @staticmethod
+    async def _reject(send, error: RequestBodyTooLarge) -> None:
+        body = json.dumps({"detail": error.detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": error.status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
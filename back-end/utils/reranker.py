@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """Re-scores retrieved chunks against the query with a local ONNX cross-encoder (fastembed).
+
+    Candidates are scored in batches of `batch_size`, best retrieval rank first. Once the latency
+    budget is spent no further batches are started: the unscored candidates keep their retrieval
+    order behind the scored ones, so a slow CPU degrades to plain hybrid ranking instead of a
+    slow answer.
+    """
+
+    def __init__(self, model_name: str = settings.RERANK_MODEL, batch_size: int = settings.RERANK_BATCH_SIZE,
+                 threads: Optional[int] = settings.RERANK_THREADS):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.threads = threads
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                from fastembed.rerank.cross_encoder import TextCrossEncoder
+                self._model = TextCrossEncoder(model_name=self.model_name, threads=self.threads)
+            return self._model
+
+    def rerank(self, query: str, results: list, top_k: int, budget_ms: float = settings.RERANK_BUDGET_MS) -> list:
+        """Returns the `top_k` best of `results` (HybridResult-like objects), scores replaced by rerank scores."""
+        if not results:
+            return []
+        deadline = time.perf_counter() + budget_ms / 1000
+        model = self.model
+        scores = []
+        for start in range(0, len(results), self.batch_size):
+            if scores and time.perf_counter() > deadline:
+                logger.warning("Rerank budget of %s ms spent after %d/%d candidates", budget_ms, len(scores), len(results))
+                break
+            batch = results[start:start + self.batch_size]
+            scores.extend(model.rerank(query, [result.payload.get("text", "") for result in batch],
+                                       batch_size=self.batch_size))
+
+        scored = sorted(zip(scores, results), key=lambda pair: pair[0], reverse=True)
+        for score, result in scored:
+            result.score = float(score)
+        unscored = results[len(scores):]
+        floor = min(scores) if scores else 0.0
+        for rank, result in enumerate(unscored, start=1):
+            result.score = float(floor - rank)
+        return ([result for _, result in scored] + unscored)[:top_k]
+
+    async def rerank_async(self, query: str, results: list, top_k: int) -> list:
+        """Runs the CPU-bound scoring on a worker thread; falls back to the retrieval order on failure."""
+        try:
+            return await asyncio.to_thread(self.rerank, query, results, top_k)
+        except Exception as e:
+            logger.error(f"Error reranking results, keeping retrieval order: {e}")
+            return results[:top_k]
+
+
+reranker = CrossEncoderReranker()
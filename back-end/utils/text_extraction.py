@@ -0,0 +1,184 @@
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, List, NamedTuple
+
+from bs4 import BeautifulSoup
+from PyPDF2 import PdfReader
+from config import settings
+
+# Written between PDF pages, so chunkers can tell page boundaries from line breaks.
+PAGE_BREAK = "\f"
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_extraction_executor() -> ProcessPoolExecutor:
+    """Returns the shared extraction process pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # "spawn" keeps worker processes independent of the API's threads (forking a threaded process is unsafe).
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.EXTRACTION_WORKERS or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def count_pdf_pages(file_path) -> int:
+    return len(PdfReader(file_path).pages)
+
+
+def extract_pdf_page_range(file_path, start: int, end: int) -> List[str]:
+    """Extracts the text of pages [start, end) of a PDF. Runs inside a worker process."""
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def extract_text_from_html(file_path):
+    """Extracts text from an HTML file."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+
+            soup = BeautifulSoup(file, 'html.parser')
+            # One line per text block keeps headings on lines of their own for structure-aware chunking.
+            text = soup.get_text(separator='\n', strip=True)
+            return text
+    except Exception as e:
+        logger.error(f"Error extracting text from HTML: {e}")
+        return ""
+
+
+def recycle_extraction_executor(executor: ProcessPoolExecutor) -> None:
+    """Kills the workers of `executor` and makes the next extraction start a fresh pool.
+
+    A worker stuck in a pathological page cannot be interrupted and would hold its pool slot
+    forever. Tasks still pending on the old pool fail and are resubmitted by their waiters.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    # ProcessPoolExecutor has no public way to stop a running task before Python 3.14.
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ExtractedText(NamedTuple):
+    text: str
+    complete: bool  # False when pages were skipped after a timeout or error
+
+
+class _ExtractionTask:
+    """One process-pool task of a file's extraction; resubmitted once if its pool was recycled."""
+
+    def __init__(self, executor: ProcessPoolExecutor, function, args: tuple, page_count: int):
+        self.function = function
+        self.args = args
+        self.page_count = page_count
+        self.executor = executor
+        self.future = executor.submit(function, *args)
+        self.resubmitted = False
+
+    def result(self):
+        # A task is marked running as soon as it enters the pool's call queue, which holds one task
+        # beyond those the workers run. It may wait there for one other task, so its own page budget
+        # is extended by one full task's budget.
+        timeout = settings.EXTRACTION_PAGE_TIMEOUT * (self.page_count + max(1, settings.EXTRACTION_PAGES_PER_TASK))
+        try:
+            return self.future.result(timeout=timeout)
+        except (BrokenProcessPool, CancelledError):
+            if self.resubmitted:
+                raise
+            self.resubmitted = True
+            self.executor = get_extraction_executor()
+            self.future = self.executor.submit(self.function, *self.args)
+            return self.future.result(timeout=timeout)
+
+
+class _PendingExtraction:
+    """Tasks of one file's extraction, in page order."""
+
+    def __init__(self, file_path, tasks: list):
+        self.file_path = file_path
+        self.tasks = tasks  # list of _ExtractionTask
+
+    def result(self) -> ExtractedText:
+        parts = []
+        complete = True
+        for task in self.tasks:
+            try:
+                result = task.result()
+            except TimeoutError:
+                complete = False
+                logger.warning(f"Timed out extracting {task.page_count} page(s) from {self.file_path}, "
+                               f"skipping them and restarting the extraction workers")
+                recycle_extraction_executor(task.executor)
+                continue
+            except Exception as e:
+                complete = False
+                logger.error(f"Error extracting text from {self.file_path}: {e!r}")
+                continue
+            if isinstance(result, list):
+                parts.extend(result)
+            else:
+                parts.append(result)
+        # Pages are collected and joined once, so large documents stay linear in their size.
+        return ExtractedText(("\n" + PAGE_BREAK).join(parts), complete)
+
+
+def _submit_extraction(executor: ProcessPoolExecutor, file_path) -> _PendingExtraction:
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.pdf':
+        try:
+            page_count = count_pdf_pages(file_path)
+        except Exception as e:
+            logger.error(f"Error extracting text from PDF: {e}")
+            return _PendingExtraction(file_path, [])
+        step = max(1, settings.EXTRACTION_PAGES_PER_TASK)
+        tasks = [
+            _ExtractionTask(executor, extract_pdf_page_range, (file_path, start, min(start + step, page_count)),
+                            min(start + step, page_count) - start)
+            for start in range(0, page_count, step)
+        ]
+        return _PendingExtraction(file_path, tasks)
+    elif ext in ['.html', '.htm']:
+        return _PendingExtraction(file_path, [_ExtractionTask(executor, extract_text_from_html, (file_path,), 1)])
+    else:
+        logger.warning(f"Unsupported file type, skipping {file_path}")
+        return _PendingExtraction(file_path, [])
+
+
+def extract_texts(file_paths: Iterable) -> Iterator[ExtractedText]:
+    """Extracts the text of each file in order, running files and PDF page ranges in the process pool.
+
+    Up to EXTRACTION_WORKERS files are extracted ahead of the consumer, so extraction of the
+    next files overlaps with whatever the caller does with the current one. Each result says
+    whether every page made it, so partial text is not mistaken for the whole file.
+    """
+    lookahead = max(1, settings.EXTRACTION_WORKERS or os.cpu_count())
+    pending = deque()
+    for file_path in file_paths:
+        # Fetched per file: a timeout replaces the pool.
+        pending.append(_submit_extraction(get_extraction_executor(), file_path))
+        if len(pending) > lookahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def shutdown_extraction_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
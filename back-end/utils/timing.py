@@ -0,0 +1,49 @@
+import time
+from contextlib import contextmanager
+
+from utils.metrics import CHAT_STAGE_SECONDS
+
+
+class StageTimer:
+    """Collects per-stage latencies (in milliseconds) for one request.
+
+    Every recorded stage is also observed in the chat stage histogram exported on /metrics.
+    """
+
+    def __init__(self, histogram=CHAT_STAGE_SECONDS):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.histogram = histogram
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def record(self, name: str, start: float) -> None:
+        """Records the time elapsed since `start` (a time.perf_counter() value) under `name`."""
+        seconds = time.perf_counter() - start
+        self.stages[name] = round(seconds * 1000, 1)
+        self.histogram.labels(stage=name).observe(seconds)
+
+    async def track(self, name: str, awaitable):
+        """Awaits `awaitable` and records how long it took under `name`."""
+        with self.stage(name):
+            return await awaitable
+
+    def mark(self, name: str) -> None:
+        """Records the time elapsed since the request started, e.g. time to first token."""
+        self.record(name, self.started)
+
+    def summary(self) -> dict:
+        """The stages recorded so far plus the total; the total is fixed by the first call."""
+        if "total" not in self.stages:
+            self.mark("total")
+        return dict(self.stages)
+
+    def server_timing_header(self) -> str:
+        """Formats the breakdown as a Server-Timing header value."""
+        return ", ".join(f"{name};dur={duration}" for name, duration in self.summary().items())
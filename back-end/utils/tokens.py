@@ -0,0 +1,47 @@
+import logging
+import re
+import threading
+from typing import List, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """Returns the configured Hugging Face tokenizer, or None if it cannot be loaded (e.g. offline)."""
+    global _tokenizer, _tokenizer_loaded
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            _tokenizer_loaded = True
+            try:
+                from tokenizers import Tokenizer
+                _tokenizer = Tokenizer.from_pretrained(settings.TOKENIZER_MODEL)
+            except Exception as e:
+                logger.warning(f"Could not load tokenizer {settings.TOKENIZER_MODEL}, estimating token counts: {e}")
+        return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """Counts the tokens of `text` with the configured tokenizer, falling back to a word/punctuation estimate."""
+    if not text:
+        return 0
+    tokenizer = get_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return len(_WORD_PATTERN.findall(text))
+
+
+def token_spans(text: str) -> List[Tuple[int, int]]:
+    """Character (start, end) offsets of each token of `text`, from the tokenizer or the same fallback estimate."""
+    if not text:
+        return []
+    tokenizer = get_tokenizer()
+    if tokenizer is not None:
+        return [tuple(offset) for offset in tokenizer.encode(text, add_special_tokens=False).offsets]
+    return [match.span() for match in _WORD_PATTERN.finditer(text)]
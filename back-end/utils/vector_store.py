@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+
+import httpx
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[QdrantClient] = None
+_async_client: Optional[AsyncQdrantClient] = None
+_client_lock = threading.RLock()
+
+
+class _LocalAsyncClient:
+    """Async view of the in-memory sync client.
+
+    Qdrant's local mode keeps its data inside the client instance, so a separate
+    AsyncQdrantClient(":memory:") would never see the points that indexing wrote.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        async def call(*args, **kwargs):
+            return attribute(*args, **kwargs)
+        return call
+
+
+def _client_kwargs() -> dict:
+    """Connection settings shared by the sync and async clients."""
+    if settings.QDRANT_URL == ":memory:":
+        return {"location": ":memory:"}
+    kwargs = {
+        "url": settings.QDRANT_URL,
+        "api_key": settings.QDRANT_API_KEY,
+        "prefer_grpc": settings.QDRANT_PREFER_GRPC,
+        "grpc_port": settings.QDRANT_GRPC_PORT,
+        "timeout": settings.QDRANT_TIMEOUT,
+    }
+    if not settings.QDRANT_PREFER_GRPC:
+        # Extra keyword arguments reach the underlying httpx client, whose pool keeps connections alive.
+        kwargs["limits"] = httpx.Limits(
+            max_connections=settings.QDRANT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.QDRANT_MAX_CONNECTIONS
+        )
+    return kwargs
+
+
+def get_qdrant_client() -> QdrantClient:
+    """Returns the process-wide Qdrant client used by indexing and maintenance code."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = QdrantClient(**_client_kwargs())
+        return _client
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Returns the process-wide async Qdrant client used by the request path."""
+    global _async_client
+    with _client_lock:
+        if _async_client is None:
+            if settings.QDRANT_URL == ":memory:":
+                _async_client = _LocalAsyncClient(get_qdrant_client())
+            else:
+                _async_client = AsyncQdrantClient(**_client_kwargs())
+        return _async_client
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (ResponseHandlingException, httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    return isinstance(error, UnexpectedResponse) and error.status_code is not None and error.status_code >= 500
+
+
+def call_with_retries(function, *args, **kwargs):
+    """Calls a Qdrant client method, retrying transient failures with exponential backoff."""
+    for attempt in range(settings.QDRANT_RETRIES + 1):
+        try:
+            return function(*args, **kwargs)
+        except Exception as e:
+            if attempt == settings.QDRANT_RETRIES or not _is_retryable(e):
+                raise
+            logger.warning(f"Qdrant call failed ({e}), retrying (attempt {attempt + 1}/{settings.QDRANT_RETRIES})")
+            time.sleep(settings.QDRANT_RETRY_BACKOFF * (2 ** attempt))
+
+
+async def call_with_retries_async(function, *args, **kwargs):
+    """Async counterpart of `call_with_retries` for AsyncQdrantClient methods."""
+    for attempt in range(settings.QDRANT_RETRIES + 1):
+        try:
+            return await function(*args, **kwargs)
+        except Exception as e:
+            if attempt == settings.QDRANT_RETRIES or not _is_retryable(e):
+                raise
+            logger.warning(f"Qdrant call failed ({e}), retrying (attempt {attempt + 1}/{settings.QDRANT_RETRIES})")
+            await asyncio.sleep(settings.QDRANT_RETRY_BACKOFF * (2 ** attempt))
+
+
+def collection_for_user(user_id: str) -> str:
+    """Name of the collection holding the user's points, depending on QDRANT_COLLECTION_MODE."""
+    if settings.QDRANT_COLLECTION_MODE == "shared":
+        return settings.QDRANT_SHARED_COLLECTION
+    if settings.QDRANT_COLLECTION_MODE != "per_user":
+        raise ValueError(f"Unknown collection mode '{settings.QDRANT_COLLECTION_MODE}'. Expected 'per_user' or 'shared'")
+    return f"{user_id}_collection"
+
+
+def is_shared_collection(collection_name: str) -> bool:
+    """Whether the collection holds every user's points. Decided by the mode, not the name alone:
+    in per_user mode a user whose id is "shared" owns a collection called "shared_collection"."""
+    return settings.QDRANT_COLLECTION_MODE == "shared" and collection_name == settings.QDRANT_SHARED_COLLECTION
+
+
+def tenant_condition(user_id: str) -> models.FieldCondition:
+    return models.FieldCondition(key="user_id", match=models.MatchValue(value=str(user_id)))
+
+
+def tenant_filter(collection_name: str, user_id: Optional[str]) -> Optional[models.Filter]:
+    """Filter restricting a search to the user's points. Per-user collections need none; the
+    shared collection refuses to be searched without a user, so one tenant never sees another's chunks."""
+    if not is_shared_collection(collection_name):
+        return None
+    if user_id is None:
+        raise ValueError(f"Searching the shared collection '{collection_name}' requires a user_id")
+    return models.Filter(must=[tenant_condition(user_id)])
+
+
+def _quantization_config():
+    if settings.QDRANT_QUANTIZATION == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=0.99,
+            always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM
+        ))
+    if settings.QDRANT_QUANTIZATION == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(
+            always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM
+        ))
+    if settings.QDRANT_QUANTIZATION != "none":
+        raise ValueError(f"Unknown quantization '{settings.QDRANT_QUANTIZATION}'. Expected 'none', 'scalar' or 'binary'")
+    return None
+
+
+def _hnsw_config(shared: bool) -> models.HnswConfigDiff:
+    if shared:
+        # Every search is filtered by tenant, so per-user graphs (payload_m) replace the global one (m=0).
+        return models.HnswConfigDiff(
+            m=0,
+            payload_m=settings.QDRANT_SHARED_HNSW_PAYLOAD_M,
+            ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+            on_disk=settings.QDRANT_HNSW_ON_DISK
+        )
+    return models.HnswConfigDiff(
+        m=settings.QDRANT_HNSW_M,
+        ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+        on_disk=settings.QDRANT_HNSW_ON_DISK
+    )
+
+
+def collection_config(collection_name: str, shared: Optional[bool] = None) -> dict:
+    """Keyword arguments for create_collection, built from the QDRANT_* collection settings.
+    `shared` defaults to is_shared_collection(collection_name)."""
+    if shared is None:
+        shared = is_shared_collection(collection_name)
+    return {
+        "vectors_config": {
+            "dense_vectors": models.VectorParams(
+                size=settings.DENSE_VECTOR_SIZE,
+                distance=models.Distance.COSINE,
+                on_disk=settings.QDRANT_DENSE_ON_DISK
+            )
+        },
+        "sparse_vectors_config": {
+            "sparse_vectors": models.SparseVectorParams(
+                index=models.SparseIndexParams(on_disk=True)
+            )
+        },
+        "hnsw_config": _hnsw_config(shared),
+        "quantization_config": _quantization_config(),
+        "on_disk_payload": settings.QDRANT_ON_DISK_PAYLOAD,
+    }
+
+
+def dense_search_params() -> Optional[models.SearchParams]:
+    """Search parameters for dense queries: HNSW beam width and quantization rescoring."""
+    quantization = None
+    if settings.QDRANT_QUANTIZATION != "none":
+        quantization = models.QuantizationSearchParams(
+            rescore=settings.QDRANT_QUANTIZATION_RESCORE,
+            oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING
+        )
+    if quantization is None and settings.QDRANT_HNSW_EF is None:
+        return None
+    return models.SearchParams(hnsw_ef=settings.QDRANT_HNSW_EF, quantization=quantization)
+
+
+def ensure_payload_indexes(client: QdrantClient, collection_name: str, shared: Optional[bool] = None) -> None:
+    """Creates the QDRANT_PAYLOAD_INDEXES keyword indexes; indexes that already exist are left as they are.
+
+    In the shared collection user_id is always indexed as the tenant key, which makes Qdrant
+    store each user's points together. `shared` defaults to is_shared_collection(collection_name).
+    """
+    if shared is None:
+        shared = is_shared_collection(collection_name)
+    field_names = list(settings.QDRANT_PAYLOAD_INDEXES)
+    if shared and "user_id" not in field_names:
+        field_names.append("user_id")
+    for field_name in field_names:
+        field_schema = models.PayloadSchemaType.KEYWORD
+        if field_name == "user_id" and shared:
+            field_schema = models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True)
+        call_with_retries(
+            client.create_payload_index,
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema,
+            wait=True
+        )
+
+
+def sync_collection_config(client: QdrantClient, collection_name: str, shared: Optional[bool] = None) -> None:
+    """Applies the current QDRANT_* collection settings to an existing collection.
+
+    Qdrant rebuilds the affected segments in the background, so the collection stays searchable.
+    Switching QDRANT_QUANTIZATION back to "none" removes the quantized vectors.
+    `shared` defaults to is_shared_collection(collection_name).
+    """
+    if shared is None:
+        shared = is_shared_collection(collection_name)
+    quantization = _quantization_config()
+    call_with_retries(
+        client.update_collection,
+        collection_name=collection_name,
+        vectors_config={"dense_vectors": models.VectorParamsDiff(on_disk=settings.QDRANT_DENSE_ON_DISK)},
+        hnsw_config=_hnsw_config(shared),
+        quantization_config=quantization if quantization is not None else models.Disabled.DISABLED,
+        collection_params=models.CollectionParamsDiff(on_disk_payload=settings.QDRANT_ON_DISK_PAYLOAD)
+    )
+    ensure_payload_indexes(client, collection_name, shared)
+
+
+def check_health() -> dict:
+    """Pings Qdrant and reports whether it is reachable and how long the round trip took."""
+    start = time.perf_counter()
+    try:
+        collections = get_qdrant_client().get_collections().collections
+        return {
+            "status": "ok",
+            "url": settings.QDRANT_URL,
+            "collections": len(collections),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+    except Exception as e:
+        return {
+            "status": "unavailable",
+            "url": settings.QDRANT_URL,
+            "error": str(e),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
@@ -131,6 +131,21 @@ class ChatbotAPI:
             st.error(f"Error uploading file: {str(e)}")
             return False
     
+    def upload_files(self, user_id: str, files) -> Optional[Dict]:
+        """Upload several files in one request; they are indexed together"""
+        try:
+            response = requests.post(
+                f"{self.base_url}/api/v1/uploads/bulk-upload",
+                params={"user_id": user_id},
+                files=[("files", (file.name, file, file.type)) for file in files]
+            )
+            if response.status_code == 200:
+                return response.json()
+            return None
+        except Exception as e:
+            st.error(f"Error uploading files: {str(e)}")
+            return None
+    
     def get_files(self, user_id: str) -> Optional[List]:
         """Get all files for a user"""
         try:
@@ -269,15 +284,21 @@ def sidebar():
         st.subheader("📁 File Management")
         
         # File upload
-        uploaded_file = st.file_uploader(
-            "Upload a file",
-            type=['txt', 'pdf', 'doc', 'docx', 'csv', 'json', 'py', 'md']
+        uploaded_files = st.file_uploader(
+            "Upload files",
+            type=['txt', 'pdf', 'doc', 'docx', 'csv', 'json', 'py', 'md'],
+            accept_multiple_files=True
         )
         
-        if uploaded_file and st.button("Upload File"):
+        if uploaded_files and st.button("Upload Files"):
             user_id = st.session_state.user_id
-            if st.session_state.api_client.upload_file(user_id, uploaded_file):
-                st.success(f"File '{uploaded_file.name}' uploaded successfully!")
+            result = st.session_state.api_client.upload_files(user_id, uploaded_files)
+            if result:
+                st.success(f"{len(result['files'])} file(s) uploaded successfully!")
+                for duplicate in result["duplicates"]:
+                    st.info(f"'{duplicate['file_name']}' was already uploaded.")
+                for rejected in result["rejected"]:
+                    st.warning(f"'{rejected['file_name']}' was skipped: {rejected['reason']}")
                 st.rerun()
         
         # Display uploaded files